@@ -1,12 +1,17 @@
 # Django core imports
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.admin import GroupAdmin as BaseGroupAdmin
 from django.contrib.auth.models import User, Group
 from django.db import models
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html_join
 
 # Third-party imports
 from unfold.admin import ModelAdmin
+from unfold.decorators import action, display
 from unfold.forms import (
     UserChangeForm,
     UserCreationForm,
@@ -38,8 +43,12 @@ from .models import (
     Warehouse,
     Stock,
     Organization,
-    APIKey
+    APIKey,
+    ImportJob,
+    Job
 )
+from .imports import run_import_job
+from .jobs import enqueue
 
 # Unregister default admin models to customize them
 admin.site.unregister(User)
@@ -50,6 +59,21 @@ admin.site.unregister(DjangoJobExecution)
 admin.site.site_url = None
 
 
+class BulkImportMixin:
+    """
+    Adds a "Bulk import" button to the changelist. Large CSV files go through
+    a background ImportJob instead of the row-by-row import of django-import-export.
+    """
+    actions_list = ['bulk_import']
+
+    @action(description='Bulk import', url_path='bulk-import', permissions=['bulk_import'])
+    def bulk_import(self, request):
+        return redirect(f"{reverse('admin:api_importjob_add')}?model={self.model._meta.model_name}")
+
+    def has_bulk_import_permission(self, request, obj=None):
+        return self.has_add_permission(request) and request.user.has_perm('api.add_importjob')
+
+
 @admin.register(LoginHistory)
 class LoginHistoryAdmin(ExportMixin, ModelAdmin):
     """Admin interface for login history tracking."""
@@ -92,7 +116,7 @@ class GroupAdmin(BaseGroupAdmin, ModelAdmin):
 
 
 @admin.register(Product)
-class ProductAdmin(ModelAdmin, ImportExportModelAdmin):
+class ProductAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing products with import/export functionality."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -118,7 +142,7 @@ class ProductAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Category)
-class CategoryAdmin(ModelAdmin, ImportExportModelAdmin):
+class CategoryAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing product categories."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -136,7 +160,7 @@ class CategoryAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Supplier)
-class SupplierAdmin(ModelAdmin, ImportExportModelAdmin):
+class SupplierAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing suppliers."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -156,7 +180,7 @@ class SupplierAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(ProductSupplier)
-class ProductSupplierAdmin(ModelAdmin, ImportExportModelAdmin):
+class ProductSupplierAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing product-supplier relationships."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -174,12 +198,12 @@ class ProductSupplierAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(ProductImage)
-class ProductImageAdmin(ModelAdmin, ImportExportModelAdmin):
+class ProductImageAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing product images."""
     compressed_fields = True
     warn_unsaved_form = True
     list_filter_submit = True
-    list_display = ('product', 'image')
+    list_display = ('product', 'image', 'renditions_ready')
     list_filter = (('product', ChoicesDropdownFilter),)
     search_fields = ['product']
 
@@ -192,9 +216,13 @@ class ProductImageAdmin(ModelAdmin, ImportExportModelAdmin):
         models.ImageField: {'widget': ImageUploaderWidget}
     }
 
+    @display(description='Renditions', boolean=True)
+    def renditions_ready(self, obj):
+        return not obj.renditions_stale
+
 
 @admin.register(Warehouse)
-class WarehouseAdmin(ModelAdmin, ImportExportModelAdmin):
+class WarehouseAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing warehouses."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -214,7 +242,7 @@ class WarehouseAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Stock)
-class StockAdmin(ModelAdmin, ImportExportModelAdmin):
+class StockAdmin(BulkImportMixin, ModelAdmin, ImportExportModelAdmin):
     """Admin interface for managing product stock levels."""
     compressed_fields = True
     warn_unsaved_form = True
@@ -228,12 +256,110 @@ class StockAdmin(ModelAdmin, ImportExportModelAdmin):
     export_form_class = SelectableFieldsExportForm
 
 
+@admin.register(ImportJob)
+class ImportJobAdmin(ModelAdmin):
+    """Admin interface for uploading bulk imports and following their progress."""
+    compressed_fields = True
+    list_display = ('id', 'model', 'job_status', 'progress', 'created_rows', 'updated_rows', 'failed_rows',
+                    'created_by', 'created_at')
+    list_filter = ('status', 'model')
+    actions = ['run_again']
+    progress_fields = ('job_status', 'progress', 'created_rows', 'updated_rows', 'failed_rows',
+                       'message', 'error_report', 'created_by', 'created_at', 'started_at', 'finished_at')
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ('model', 'file')
+        return ('model', 'file', *self.progress_fields)
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return ()
+        return ('model', 'file', *self.progress_fields)
+
+    def save_model(self, request, obj, form, change):
+        """Queue the import; workers pick it up once the upload is committed."""
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            enqueue(run_import_job, obj.pk)
+
+    @display(description='Status', label={
+        ImportJob.PENDING: 'warning',
+        ImportJob.RUNNING: 'info',
+        ImportJob.DONE: 'success',
+        ImportJob.FAILED: 'danger',
+    })
+    def job_status(self, obj):
+        return obj.status, obj.get_status_display()
+
+    @display(description='Progress')
+    def progress(self, obj):
+        return f"{obj.processed_rows:,} / {obj.total_rows:,} rows ({obj.percent_done}%)"
+
+    @display(description='Row errors')
+    def error_report(self, obj):
+        return format_html_join('\n', 'Row {}: {}<br>', ((e['row'], e['error']) for e in obj.errors)) or '-'
+
+    @admin.action(description='Run selected failed imports again')
+    def run_again(self, request, queryset):
+        """
+        Queue failed imports that wrote nothing again. Imports that failed
+        partway have committed earlier chunks, and a rerun from the first row
+        would create their rows without an id a second time.
+        """
+        failed = queryset.filter(status=ImportJob.FAILED)
+        partial = failed.exclude(created_rows=0, updated_rows=0).count()
+        job_ids = list(failed.filter(created_rows=0, updated_rows=0).values_list('pk', flat=True))
+        ImportJob.objects.filter(pk__in=job_ids).update(
+            status=ImportJob.PENDING, processed_rows=0, created_rows=0, updated_rows=0,
+            failed_rows=0, errors=[], message='', started_at=None, finished_at=None)
+        for job_id in job_ids:
+            enqueue(run_import_job, job_id)
+        self.message_user(request, f"{len(job_ids)} imports queued again.")
+        if partial:
+            self.message_user(request, f"{partial} imports were skipped because they already wrote rows; "
+                                       "upload a file with the remaining rows instead.", level=messages.WARNING)
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    """Admin interface for the background job queue."""
+    compressed_fields = True
+    list_display = ('id', 'task', 'queue', 'job_status', 'attempts', 'run_at', 'worker', 'finished_at')
+    list_filter = ('status', 'queue')
+    search_fields = ['task']
+    readonly_fields = ('task', 'queue', 'args', 'kwargs', 'status', 'attempts', 'max_attempts', 'run_at',
+                       'worker', 'last_error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        """Jobs are queued by the application, not by hand."""
+        return False
+
+    @display(description='Status', label={
+        Job.QUEUED: 'warning',
+        Job.RUNNING: 'info',
+        Job.DONE: 'success',
+        Job.FAILED: 'danger',
+    })
+    def job_status(self, obj):
+        return obj.status, obj.get_status_display()
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry(self, request, queryset):
+        retried = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None)
+        self.message_user(request, f"{retried} jobs queued again.")
+
+
 @admin.register(APIKey)
 class APIKeyAdmin(ModelAdmin):
     """Admin interface for managing API keys."""
     compressed_fields = True
     warn_unsaved_form = True
-    list_display = ('name', 'api_key', 'is_active', 'created_at', 'updated_at')
+    list_display = ('name', 'api_key', 'is_active', 'rate_limit', 'created_at', 'updated_at')
     list_filter = (('name'), ('is_active'))
     search_fields = ['name']
 
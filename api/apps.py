@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class ApiConfig(AppConfig):
     """
@@ -19,3 +20,12 @@ class ApiConfig(AppConfig):
         This is particularly useful for loading signal handlers defined in models.py
         """
         import api.models
+
+        # Create the product search index (and its triggers) after migrations
+        post_migrate.connect(create_search_index, sender=self)
+
+
+def create_search_index(sender, **kwargs):
+    """Signal handler ensuring the FTS5 product search index exists."""
+    from .search import ensure_search_index
+    ensure_search_index()
@@ -0,0 +1,76 @@
+# Standard library imports
+import threading
+import time
+from collections import OrderedDict
+
+# Django imports
+from django.conf import settings
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Every gunicorn worker holds its own instance, so entries are never shared
+    between processes and go stale after at most `ttl` seconds.
+    """
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None when the key is absent or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries when full."""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Drop a single entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# API key verification caches. Unknown keys live in their own, smaller cache
+# so that credential-stuffing traffic cannot evict verified keys.
+_api_key_settings = getattr(settings, 'API_KEY_CACHE', {})
+
+verified_api_keys = TTLCache(
+    max_size=_api_key_settings.get('MAX_SIZE', 1024),
+    ttl=_api_key_settings.get('TTL', 60),
+)
+rejected_api_keys = TTLCache(
+    max_size=_api_key_settings.get('NEGATIVE_MAX_SIZE', 4096),
+    ttl=_api_key_settings.get('NEGATIVE_TTL', 10),
+)
+
+
+def invalidate_api_key(key):
+    """Forget everything this worker knows about an API key."""
+    verified_api_keys.delete(key)
+    rejected_api_keys.delete(key)
@@ -0,0 +1,106 @@
+# Standard library imports
+from datetime import timedelta
+
+# Django imports
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Third-party imports
+from ninja.errors import HttpError
+
+# Local imports
+from .models import Tombstone
+from .pagination import decode_cursor, encode_cursor, keyset_filter
+
+# Orderings shared by the feed and its watermark
+CHANGE_ORDERING = ('updated_at', 'id')
+TOMBSTONE_ORDERING = ('deleted_at', 'id')
+
+# Position before any row
+EPOCH = '1970-01-01T00:00:00+00:00'
+
+
+def parse_watermark(since, start):
+    """
+    Turn the `since` parameter into (change position, tombstone position).
+    Accepts the opaque watermark returned by a previous call or an ISO 8601
+    timestamp. Without one, every current row is returned and only deletions
+    after `start` are reported, since the consumer never saw older rows.
+
+    Raises:
+        HttpError: If `since` is neither, or is older than tombstone retention
+    """
+    if not since:
+        return [EPOCH, ''], [start.isoformat(), 0]
+
+    timestamp = parse_datetime(since)
+    if timestamp is not None:
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        changed, deleted = [timestamp.isoformat(), ''], [timestamp.isoformat(), 0]
+    else:
+        values, _ = decode_cursor(since)
+        if len(values) != 4:
+            raise HttpError(400, 'Invalid watermark')
+        changed, deleted = values[:2], values[2:]
+        timestamp = parse_datetime(deleted[0] or '')
+        if timestamp is None:
+            raise HttpError(400, 'Invalid watermark')
+
+    # Deletions older than the retention window are gone, so the consumer must resync
+    horizon = timezone.now() - timedelta(days=settings.CHANGE_FEED_TOMBSTONE_MAX_AGE)
+    if timestamp < horizon:
+        raise HttpError(410, 'Watermark is older than tombstone retention, full resync required')
+
+    return changed, deleted
+
+
+def change_feed(queryset, since=None, limit=None):
+    """
+    Return rows changed and deleted after a watermark, ordered by
+    (updated_at, id) and (deleted_at, id) respectively.
+
+    Rows modified in the last CHANGE_FEED_SETTLE_SECONDS are held back so a
+    transaction that commits late cannot slip in behind an advanced watermark.
+
+    Args:
+        queryset: Queryset of the model to report on
+        since (str): Watermark from a previous call, or an ISO 8601 timestamp
+        limit (int): Maximum rows per list (capped by CHANGE_FEED_MAX_LIMIT)
+
+    Returns:
+        dict: changed rows, deleted tombstones, next watermark and has_more flag
+    """
+    model = queryset.model
+    limit = max(1, min(limit or settings.CHANGE_FEED_MAX_LIMIT, settings.CHANGE_FEED_MAX_LIMIT))
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    changed_position, deleted_position = parse_watermark(since, settled)
+
+    changed = list(queryset
+                   .filter(keyset_filter(model, CHANGE_ORDERING, changed_position),
+                           updated_at__lt=settled)
+                   .order_by(*CHANGE_ORDERING)[:limit + 1])
+    deleted = list(Tombstone.objects
+                   .filter(keyset_filter(Tombstone, TOMBSTONE_ORDERING, deleted_position),
+                           model=model._meta.model_name,
+                           deleted_at__lt=settled)
+                   .order_by(*TOMBSTONE_ORDERING)[:limit + 1])
+
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    # Advance each half of the watermark independently
+    if changed:
+        last = changed[-1]
+        changed_position = [last.updated_at.isoformat(), last.pk]
+    if deleted:
+        last = deleted[-1]
+        deleted_position = [last.deleted_at.isoformat(), last.pk]
+
+    return {
+        'changed': changed,
+        'deleted': deleted,
+        'next': encode_cursor([*changed_position, *deleted_position]),
+        'has_more': has_more,
+    }
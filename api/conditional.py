@@ -0,0 +1,126 @@
+# Standard library imports
+import hashlib
+from functools import wraps
+from inspect import isawaitable
+
+# Django imports
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# Third-party imports
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from ninja.utils import contribute_operation_callback
+
+# Local imports
+from .versions import get_versions, versions_timestamp
+
+
+def make_etag(*parts):
+    """Build a strong ETag value from arbitrary parts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    return quote_etag(digest.hexdigest())
+
+
+def _set_validators(response, etag, last_modified):
+    if etag:
+        # Pre-compressed bodies (see api.response_cache) are not byte-identical
+        if response.has_header('Content-Encoding') and etag.startswith('"'):
+            etag = 'W/' + etag
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let clients keep the body but always revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def _add_validator_headers(operation):
+    """Wrap the operation so successful responses carry the computed validators."""
+    run = operation.run
+
+    def add_validators(request, response):
+        validators = getattr(request, '_conditional_validators', None)
+        if validators and response.status_code == 200:
+            _set_validators(response, *validators)
+        return response
+
+    if iscoroutinefunction(run):
+        @wraps(run)
+        async def run_with_validators(request, *args, **kwargs):
+            return add_validators(request, await run(request, *args, **kwargs))
+    else:
+        @wraps(run)
+        def run_with_validators(request, *args, **kwargs):
+            return add_validators(request, run(request, *args, **kwargs))
+
+    operation.run = run_with_validators
+
+
+def _check_validators(request, result):
+    """Return a 304 response for matching validators, or remember them for the response."""
+    etag, last_modified = result
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        _set_validators(not_modified, etag, last_modified)
+        return not_modified
+    request._conditional_validators = result
+    return None
+
+
+def conditional(validators):
+    """
+    Decorator adding ETag/Last-Modified support to a ninja GET operation.
+
+    `validators(request, **kwargs)` returns (etag, last_modified) from cheap
+    lookups, or None to skip conditional handling (e.g. the object is missing).
+    It runs after authentication and throttling but before the view, so a
+    matching If-None-Match / If-Modified-Since returns 304 without querying,
+    serializing or compressing the full response. Async views may use async
+    validators; sync ones run in a thread there, as they read the cache.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            run_validators = (validators if iscoroutinefunction(validators)
+                              else sync_to_async(validators, thread_sensitive=False))
+
+            @wraps(view_func)
+            async def view_with_validators(request, **kwargs):
+                result = run_validators(request, **kwargs)
+                if isawaitable(result):
+                    result = await result
+                if result is not None:
+                    not_modified = _check_validators(request, result)
+                    if not_modified is not None:
+                        return not_modified
+                return await view_func(request, **kwargs)
+        else:
+            @wraps(view_func)
+            def view_with_validators(request, **kwargs):
+                result = validators(request, **kwargs)
+                if result is not None:
+                    not_modified = _check_validators(request, result)
+                    if not_modified is not None:
+                        return not_modified
+                return view_func(request, **kwargs)
+
+        # Copy rather than share the callback list inherited through @wraps
+        view_with_validators._ninja_contribute_to_operation = list(
+            getattr(view_func, '_ninja_contribute_to_operation', []))
+        contribute_operation_callback(view_with_validators, _add_validator_headers)
+        return view_with_validators
+
+    return decorator
+
+
+def table_validators(*tables):
+    """
+    Validators for responses derived from whole tables (listings): the ETag
+    covers the full request path and the tables' version tokens, and
+    Last-Modified is the time of the most recent change to any of them.
+    """
+    def validators(request, **kwargs):
+        versions = get_versions(*tables)
+        return make_etag(request.get_full_path(), *versions), versions_timestamp(versions)
+    return validators
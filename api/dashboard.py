@@ -0,0 +1,88 @@
+# Standard library imports
+from datetime import timedelta
+
+# Django imports
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+# Local imports
+from .models import DashboardMetrics, Product, Stock
+
+# Number of categories shown in the dashboard distribution
+CATEGORY_DISTRIBUTION_SIZE = 8
+
+
+def _compute_products():
+    """Product counts and stock value, in a single pass over the products table."""
+    figures = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(is_active=True)),
+        low_stock_products=Count('id', filter=Q(stock_quantity__lt=settings.DASHBOARD_LOW_STOCK_THRESHOLD)),
+        total_stock_value=Sum(F('price') * F('stock_quantity')),
+    )
+    figures['total_stock_value'] = figures['total_stock_value'] or 0
+    return figures
+
+
+def _compute_stock():
+    return {'total_stock_items': Stock.objects.aggregate(total=Sum('quantity'))['total'] or 0}
+
+
+def _compute_categories():
+    distribution = (Product.objects.values('categories__name')
+                    .annotate(count=Count('id'))
+                    .order_by('-count')[:CATEGORY_DISTRIBUTION_SIZE])
+    return {'category_distribution': [
+        {'name': row['categories__name'], 'count': row['count']} for row in distribution
+    ]}
+
+
+SECTION_COMPUTERS = {
+    'products': _compute_products,
+    'stock': _compute_stock,
+    'categories': _compute_categories,
+}
+
+
+def refresh_dashboard_metrics(force=False):
+    """
+    Recompute the dirty sections of the dashboard snapshot (all of them with `force`).
+
+    Returns:
+        list: Names of the refreshed sections
+    """
+    metrics, _ = DashboardMetrics.objects.get_or_create(pk=1)
+    sections = [
+        section for section in DashboardMetrics.SECTIONS
+        if force or getattr(metrics, f'{section}_dirty')
+    ]
+    if not sections:
+        return []
+
+    # Clear the flags first, so writes landing while we compute flag the section again
+    snapshot = DashboardMetrics.objects.filter(pk=1)
+    snapshot.update(**{f'{section}_dirty': False for section in sections})
+
+    values = {}
+    for section in sections:
+        values.update(SECTION_COMPUTERS[section]())
+    snapshot.update(computed_at=timezone.now(), **values)
+    return sections
+
+
+def get_dashboard_metrics():
+    """
+    Return the dashboard snapshot, computing it on first use. Dirty sections
+    of a snapshot older than DASHBOARD_METRICS_REFRESH_SECONDS are recomputed
+    here too, so the dashboard stays current when the scheduler is not running.
+    """
+    metrics = DashboardMetrics.objects.filter(pk=1, computed_at__isnull=False).first()
+    if metrics is None:
+        refresh_dashboard_metrics(force=True)
+        return DashboardMetrics.objects.get(pk=1)
+
+    stale = timezone.now() - metrics.computed_at > timedelta(seconds=settings.DASHBOARD_METRICS_REFRESH_SECONDS)
+    if stale and refresh_dashboard_metrics():
+        metrics = DashboardMetrics.objects.get(pk=1)
+    return metrics
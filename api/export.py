@@ -0,0 +1,82 @@
+# Standard library imports
+# None required
+
+# Django imports
+from django.conf import settings
+
+# Third-party imports
+import orjson
+
+# Local imports
+from .schemas import ProductExportSchema, ProductImageSchema, CategorySchema
+
+
+def export_products(queryset, include_images=False, include_categories=False, chunk_size=None):
+    """
+    Stream products as newline-delimited JSON.
+
+    Rows are read with a chunked `.iterator()` (related rows are prefetched per
+    chunk) and every chunk is serialized with orjson and yielded as one block,
+    so memory stays flat regardless of catalog size.
+
+    Args:
+        queryset: Product queryset to export
+        include_images (bool): Attach each product's images
+        include_categories (bool): Attach each product's categories
+        chunk_size (int): Rows per database fetch and per yielded block
+
+    Yields:
+        bytes: NDJSON-encoded block of up to `chunk_size` products
+    """
+    chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    queryset = _export_queryset(queryset, include_images, include_categories)
+
+    block = []
+    for product in queryset.iterator(chunk_size=chunk_size):
+        block.append(_export_row(product, include_images, include_categories))
+        if len(block) >= chunk_size:
+            yield b''.join(block)
+            block = []
+
+    if block:
+        yield b''.join(block)
+
+
+async def aexport_products(queryset, include_images=False, include_categories=False, chunk_size=None):
+    """
+    `export_products` for ASGI: rows are read with the async ORM, so the
+    server streams the blocks instead of collecting a sync iterator first.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    queryset = _export_queryset(queryset, include_images, include_categories)
+
+    block = []
+    async for product in queryset.aiterator(chunk_size=chunk_size):
+        block.append(_export_row(product, include_images, include_categories))
+        if len(block) >= chunk_size:
+            yield b''.join(block)
+            block = []
+
+    if block:
+        yield b''.join(block)
+
+
+def _export_queryset(queryset, include_images, include_categories):
+    queryset = queryset.order_by('pk')
+    if include_images:
+        queryset = queryset.prefetch_related('images')
+    if include_categories:
+        queryset = queryset.prefetch_related('categories')
+    return queryset
+
+
+def _export_row(product, include_images, include_categories):
+    """Serialize one product (and its prefetched relations) as an NDJSON line."""
+    row = ProductExportSchema.from_orm(product).model_dump()
+    if include_images:
+        row['images'] = [ProductImageSchema.from_orm(image).model_dump()
+                         for image in product.images.all()]
+    if include_categories:
+        row['categories'] = [CategorySchema.from_orm(category).model_dump()
+                             for category in product.categories.all()]
+    return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,85 @@
+# Standard library imports
+import hashlib
+import io
+
+# Third-party imports
+from PIL import ExifTags, Image, ImageOps
+
+# AVIF is offered only when Pillow can encode it (the optional
+# `pillow-avif-plugin` package registers an encoder on older Pillow versions)
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Pillow format names and MIME types of the rendition formats
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+
+def supported_formats(formats):
+    """Keep the formats this Pillow build can encode, in the given order."""
+    Image.init()
+    return [fmt for fmt in formats if fmt in FORMATS and FORMATS[fmt][0] in Image.SAVE]
+
+
+def target_widths(source_width, widths):
+    """
+    Widths to render for a source image: every configured width below the
+    source width, plus the source width itself when it is smaller than the
+    largest configured one. Images are never upscaled.
+    """
+    result = sorted({min(width, source_width) for width in widths})
+    return [width for width in result if width > 0]
+
+
+def render_variants(data, widths, formats, quality):
+    """
+    Decode an uploaded image once and encode it at every width and format.
+
+    This is a pure function of its arguments with no Django dependency, so
+    it runs in a separate process.
+
+    Args:
+        data (bytes): Original image file contents
+        widths (iterable): Target widths in pixels
+        formats (iterable): Rendition formats, e.g. ('avif', 'webp')
+        quality (dict): Encoder quality per format
+
+    Returns:
+        list: One dict per variant with format, width, height, mime type,
+        the first 16 hex digits of its SHA-256 (`digest`) and `content` bytes
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        largest = max(widths)
+        # Let the JPEG decoder downscale by a power of two while decoding. The
+        # box is in stored pixels, which EXIF orientations 5-8 rotate by 90°.
+        width, height = image.size
+        rotated = image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8)
+        if rotated:
+            width, height = height, width
+        box = (largest, max(1, height * largest // max(1, width)))
+        image.draft('RGB', box[::-1] if rotated else box)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        variants = []
+        for width in target_widths(image.width, widths):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, FORMATS[fmt][0], quality=quality.get(fmt, 75))
+                content = buffer.getvalue()
+                variants.append({
+                    'format': fmt,
+                    'width': width,
+                    'height': height,
+                    'type': FORMATS[fmt][1],
+                    'digest': hashlib.sha256(content).hexdigest()[:16],
+                    'content': content,
+                })
+        return variants
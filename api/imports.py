@@ -0,0 +1,370 @@
+"""
+Chunked bulk import of CSV files into the catalog models.
+
+Files use the layout of the admin's CSV export: one column per field name,
+foreign keys and many-to-many links as primary keys. Rows are read as a
+stream and written a chunk at a time, with one lookup per related model and
+a bulk upsert per chunk instead of a save() per row. Stock totals are
+recomputed once, after the last chunk.
+"""
+
+# Standard library imports
+import csv
+import io
+from itertools import islice
+
+# Django imports
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+# Third-party imports
+from djmoney.models.fields import CurrencyField
+
+# Local imports
+from .jobs import task
+from .rates import base_price_amount
+from .renditions import schedule_renditions
+from .versions import bump_versions
+
+# Dashboard sections invalidated by imports into a model (stock writes flag their own)
+DASHBOARD_SECTIONS = {
+    'product': ('products', 'categories'),
+    'category': ('categories',),
+}
+
+
+def _prepare_product(product):
+    product.price_base_amount = base_price_amount(product.price)
+
+
+# Derived fields that Model.save() would set, filled in before bulk writes
+PREPARE = {
+    'product': (_prepare_product, ('price_base_amount',)),
+}
+
+
+def _error_message(exc):
+    if isinstance(exc, ValidationError) and hasattr(exc, 'error_dict'):
+        return '; '.join(f"{field}: {' '.join(messages)}" for field, messages in exc.message_dict.items())
+    if isinstance(exc, ValidationError):
+        return ' '.join(exc.messages)
+    return str(exc)
+
+
+class BulkImporter:
+    """
+    Import rows (dicts keyed by field name) into a model in chunks.
+    Rows with the primary key of an existing object update it, other rows
+    create objects. Non-editable fields such as stock totals are ignored,
+    except the currency columns of money fields, which the export includes.
+    """
+    def __init__(self, model, chunk_size=None):
+        self.model = model
+        self.model_name = model._meta.model_name
+        self.chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+        self.pk = model._meta.pk
+        self.fields = {f.name: f for f in model._meta.concrete_fields
+                       if (f.editable or isinstance(f, CurrencyField)) and not f.primary_key}
+        self.currencies = {name: {code for code, _ in field.flatchoices}
+                           for name, field in self.fields.items() if isinstance(field, CurrencyField)}
+        self.many_to_many = {f.name: f for f in model._meta.many_to_many}
+        self.auto_now = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        self.prepare, self.prepared_fields = PREPARE.get(self.model_name, (None, ()))
+
+    def run(self, rows):
+        """Import an iterable of rows, yielding (created, updated, errors) per chunk."""
+        rows = iter(rows)
+        line = 1  # The header is line 1
+        while chunk := list(islice(rows, self.chunk_size)):
+            yield self.import_chunk(list(enumerate(chunk, start=line + 1)))
+            line += len(chunk)
+
+    def import_chunk(self, numbered_rows):
+        """
+        Import one chunk of (line number, row) pairs.
+
+        Returns:
+            tuple: Numbers of created and updated objects, and a list of
+            {'row': line, 'error': message} for the rows that were skipped
+        """
+        header = numbered_rows[0][1].keys()
+        columns = [name for name in header if name in self.fields]
+        links = [name for name in header if name in self.many_to_many]
+
+        existing = self.model._base_manager.in_bulk(
+            {pk for pk in (self._key(self.pk, row.get(self.pk.name)) for _, row in numbered_rows) if pk is not None})
+        related = self._related_keys(numbered_rows, columns, links)
+        taken = self._taken_values(numbered_rows, columns)
+
+        errors, entries = [], []
+        seen = {name: {} for name in taken}
+        seen_pks = set()
+        for line, row in numbered_rows:
+            try:
+                obj, created, linked = self._build(row, columns, links, existing, related)
+                if obj.pk is not None and obj.pk in seen_pks:
+                    raise ValidationError(f"Duplicate {self.pk.name} {obj.pk} in this file")
+                for name, owners in taken.items():
+                    value = getattr(obj, self.fields[name].attname)
+                    owner = seen[name].get(value, owners.get(value, obj.pk))
+                    if value not in (None, '') and owner != obj.pk:
+                        raise ValidationError({name: [f"{value} is already used by {owner}"]})
+            except (ValidationError, ValueError) as e:
+                errors.append({'row': line, 'error': _error_message(e)})
+                continue
+            seen_pks.add(obj.pk)
+            for name in taken:
+                seen[name][getattr(obj, self.fields[name].attname)] = obj.pk
+            entries.append((line, obj, created, linked))
+
+        update_fields = [*columns, *self.prepared_fields, *(f.name for f in self.auto_now)]
+        try:
+            self._write(entries, update_fields, links)
+        except IntegrityError:
+            # Something only the database checks (e.g. unique_together) failed:
+            # write row by row to find and skip the offending rows
+            written = []
+            for entry in entries:
+                try:
+                    self._write([entry], update_fields, links)
+                    written.append(entry)
+                except IntegrityError as e:
+                    errors.append({'row': entry[0], 'error': str(e)})
+            entries = written
+
+        if entries:
+            bump_versions(self.model_name)
+            if self.model_name == 'productimage':
+                for _, image, _, _ in entries:
+                    if image.renditions_stale:
+                        schedule_renditions(image.pk)
+
+        created = sum(1 for entry in entries if entry[2])
+        return created, len(entries) - created, errors
+
+    def _key(self, field, value):
+        """Convert a primary or foreign key from the file, or None when empty."""
+        if value in (None, ''):
+            return None
+        try:
+            return field.to_python(value.strip())
+        except ValidationError:
+            return None
+
+    def _related_keys(self, numbered_rows, columns, links):
+        """Look up, once per related model, which referenced keys exist."""
+        related = {}
+        for name in columns:
+            field = self.fields[name]
+            if field.is_relation:
+                keys = {self._key(field.target_field, row[name]) for _, row in numbered_rows} - {None}
+                related[name] = set(field.related_model._base_manager
+                                    .filter(pk__in=keys).values_list('pk', flat=True))
+        for name in links:
+            field = self.many_to_many[name]
+            target = field.related_model._meta.pk
+            keys = {self._key(target, key) for _, row in numbered_rows
+                    for key in (row[name] or '').split(',')} - {None}
+            related[name] = set(field.related_model._base_manager
+                                .filter(pk__in=keys).values_list('pk', flat=True))
+        return related
+
+    def _taken_values(self, numbered_rows, columns):
+        """Map the values of unique fields in this chunk to the objects already using them."""
+        taken = {}
+        for name in columns:
+            field = self.fields[name]
+            if field.unique and not field.is_relation:
+                values = {row[name] for _, row in numbered_rows if row[name]}
+                taken[name] = dict(self.model._base_manager
+                                   .filter(**{f'{name}__in': values}).values_list(name, 'pk'))
+        return taken
+
+    def _build(self, row, columns, links, existing, related):
+        """Build the object of one row, validated without queries."""
+        pk = self._key(self.pk, row.get(self.pk.name))
+        if pk is None and row.get(self.pk.name):
+            raise ValidationError({self.pk.name: [f"{row[self.pk.name]} is not a valid {self.pk.name}"]})
+        obj = existing.get(pk) if pk is not None else None
+        created = obj is None
+        if created:
+            obj = self.model(**({self.pk.attname: pk} if pk is not None else {}))
+
+        errors = {}
+        for name in columns:
+            field, value = self.fields[name], row[name]
+            try:
+                if field.is_relation:
+                    key = self._key(field.target_field, value)
+                    if value not in (None, '') and key not in related[name]:
+                        raise ValidationError(f"{field.related_model._meta.verbose_name} {value} does not exist")
+                    setattr(obj, field.attname, key)
+                elif isinstance(field, CurrencyField):
+                    # Checked here: clean_fields() skips non-editable fields, and reading
+                    # the money field with an unknown currency raises
+                    currency = self._value(field, value.strip().upper() if value else value)
+                    if currency not in self.currencies[name]:
+                        raise ValidationError(f"{value} is not a valid currency")
+                    setattr(obj, field.attname, currency)
+                else:
+                    setattr(obj, field.attname, self._value(field, value))
+            except ValidationError as e:
+                errors[name] = e.messages
+        for field in self.fields.values():
+            if field.is_relation and not field.null and getattr(obj, field.attname) is None:
+                errors.setdefault(field.name, ['This field is required.'])
+        if errors:
+            raise ValidationError(errors)
+
+        # Foreign keys were checked against the lookups above; their own validation queries per row
+        obj.clean_fields(exclude=[f.name for f in self.model._meta.concrete_fields
+                                  if f.is_relation or f.primary_key])
+        if self.prepare:
+            self.prepare(obj)
+
+        linked = {}
+        for name in links:
+            keys = [self._key(self.many_to_many[name].related_model._meta.pk, key)
+                    for key in (row[name] or '').split(',')]
+            keys = [key for key in keys if key is not None]
+            missing = [str(key) for key in keys if key not in related[name]]
+            if missing:
+                raise ValidationError({name: [f"{', '.join(missing)} do not exist"]})
+            linked[name] = keys
+        return obj, created, linked
+
+    def _value(self, field, value):
+        if value is None or value == '':
+            if field.null:
+                return None
+            if field.has_default():
+                return field.get_default()
+            return ''
+        return field.to_python(value)
+
+    def _write(self, entries, update_fields, links):
+        """
+        Write built objects and their many-to-many links in one transaction.
+        New and existing rows go out together as INSERT ... ON CONFLICT DO
+        UPDATE statements, which SQLite runs far faster than the CASE
+        expressions of bulk_update().
+        """
+        objs = [obj for _, obj, _, _ in entries]
+        with transaction.atomic():
+            if update_fields:
+                self.model.objects.bulk_create(objs, update_conflicts=True,
+                                               unique_fields=[self.pk.name], update_fields=update_fields)
+            else:
+                self.model.objects.bulk_create(objs, ignore_conflicts=True)
+
+            for name in links:
+                field = self.many_to_many[name]
+                through = field.remote_field.through
+                source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+                through.objects.filter(**{f'{source}__in': [obj.pk for _, obj, created, _ in entries
+                                                            if not created]}).delete()
+                through.objects.bulk_create([
+                    through(**{f'{source}_id': obj.pk, f'{target}_id': key})
+                    for _, obj, _, linked in entries for key in linked[name]
+                ], ignore_conflicts=True)
+
+
+def count_rows(file):
+    """Estimate the data rows of a CSV file from its line count."""
+    lines = 0
+    for block in iter(lambda: file.read(1024 * 1024), b''):
+        lines += block.count(b'\n')
+    file.seek(0)
+    return max(0, lines - 1)
+
+
+def import_csv(model, file, chunk_size=None, on_chunk=None):
+    """
+    Stream a CSV file (opened in binary mode) into a model.
+
+    Args:
+        model: Model class to import into
+        file: Binary file object
+        chunk_size (int): Rows per chunk (default: IMPORT_CHUNK_SIZE)
+        on_chunk (callable): Called with the running totals after every chunk
+
+    Returns:
+        dict: Totals of processed, created, updated and failed rows, and
+        the first IMPORT_MAX_ERRORS row errors
+    """
+    from .models import DashboardMetrics, deferred_stock_totals
+
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    importer = BulkImporter(model, chunk_size)
+    totals = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    failure = None
+
+    # Stock written by any chunk is recomputed once, when the block exits
+    with deferred_stock_totals():
+        try:
+            for created, updated, errors in importer.run(reader):
+                totals['processed'] += created + updated + len(errors)
+                totals['created'] += created
+                totals['updated'] += updated
+                totals['failed'] += len(errors)
+                totals['errors'] += errors[:settings.IMPORT_MAX_ERRORS - len(totals['errors'])]
+                if on_chunk:
+                    on_chunk(totals)
+        except Exception as e:
+            # Earlier chunks are committed, so their stock totals still need recomputing
+            failure = e
+    if failure is not None:
+        raise failure
+
+    sections = DASHBOARD_SECTIONS.get(importer.model_name)
+    if sections and totals['created'] + totals['updated']:
+        DashboardMetrics.mark_dirty(*sections)
+    return totals
+
+
+def fail_import_job(job, message):
+    """Mark the ImportJob of a given-up job as failed, e.g. when its worker died mid-import."""
+    from .models import ImportJob
+
+    ImportJob.objects.filter(pk=job.args[0], status__in=[ImportJob.PENDING, ImportJob.RUNNING]).update(
+        status=ImportJob.FAILED, message=message, finished_at=timezone.now())
+
+
+@task(queue='imports', max_attempts=1, on_give_up=fail_import_job)
+def run_import_job(job_id):
+    """
+    Run a pending ImportJob, recording its progress after every chunk.
+    Queued with a single attempt: rows without an id would be created twice
+    by a rerun of a partly imported file.
+    """
+    from .models import ImportJob
+
+    # Claim the job, so it never runs twice
+    if not ImportJob.objects.filter(pk=job_id, status=ImportJob.PENDING).update(
+            status=ImportJob.RUNNING, started_at=timezone.now()):
+        return
+    job = ImportJob.objects.get(pk=job_id)
+
+    def record(totals):
+        ImportJob.objects.filter(pk=job_id).update(
+            processed_rows=totals['processed'],
+            created_rows=totals['created'],
+            updated_rows=totals['updated'],
+            failed_rows=totals['failed'],
+            errors=totals['errors'],
+        )
+
+    try:
+        with job.file.open('rb') as file:
+            ImportJob.objects.filter(pk=job_id).update(total_rows=count_rows(file))
+            totals = import_csv(apps.get_model('api', job.model), file, on_chunk=record)
+        record(totals)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.DONE, total_rows=totals['processed'], finished_at=timezone.now())
+    except Exception as e:
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.FAILED, message=_error_message(e), finished_at=timezone.now())
+
@@ -0,0 +1,265 @@
+"""
+Background job queue stored in the database.
+
+Request handlers enqueue a call to a task function and return at once; the
+`worker` management command runs the queued jobs in separate processes.
+Workers claim a job with a single UPDATE, so a job runs only once, and a
+queue's concurrency limit (JOB_QUEUE_CONCURRENCY) is checked in the same
+statement. Failed jobs are retried with exponential backoff. A running
+job's heartbeat is refreshed while it runs; jobs whose heartbeat is older
+than JOB_LEASE_TIMEOUT are put back, whichever host ran them.
+"""
+
+# Standard library imports
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+# Django imports
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+def task(queue='default', max_attempts=None, on_give_up=None):
+    """
+    Mark a function as a task that can be queued with `enqueue`.
+    Only marked functions are run by workers. Arguments must be JSON
+    serializable, so pass ids rather than model instances.
+    `on_give_up(job, message)` is called when a job of the task fails
+    for the last time, including when its worker died while running it.
+    """
+    def decorator(func):
+        func.job_queue = queue
+        func.job_max_attempts = max_attempts
+        func.job_on_give_up = on_give_up
+        return func
+    return decorator
+
+
+def enqueue(func, *args, queue=None, delay=0, max_attempts=None, **kwargs):
+    """
+    Queue a call of a task function. The job is written in the caller's
+    transaction, so it only becomes visible to workers once that commits.
+
+    Args:
+        func: Function decorated with @task
+        queue (str): Queue name (default: the task's queue)
+        delay (float): Seconds to wait before the first run
+        max_attempts (int): Runs before the job is given up (default: the
+            task's, then JOB_MAX_ATTEMPTS)
+
+    Returns:
+        Job: The queued job
+    """
+    from .models import Job
+
+    if not hasattr(func, 'job_queue'):
+        raise ValueError(f"{func.__qualname__} is not a task")
+    return Job.objects.create(
+        task=f"{func.__module__}.{func.__qualname__}",
+        queue=queue or func.job_queue,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or func.job_max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def worker_name(pid=None):
+    """Identify a worker process as host:pid."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def claim_job(queues=None):
+    """
+    Claim the next due job for this process, or return None.
+
+    Each queue is tried in turn with one UPDATE that picks the oldest due job
+    and, for queues with a concurrency limit, only does so while fewer jobs
+    of the queue are running. SQLite runs the statement under its write lock,
+    so two workers can neither take the same job nor overrun a limit.
+    """
+    from .models import Job
+
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+    if queues:
+        due = due.filter(queue__in=queues)
+    # A cheap read first, so idle workers do not take the write lock
+    candidates = list(due.order_by().values_list('queue', flat=True).distinct())
+    random.shuffle(candidates)
+
+    limits = settings.JOB_QUEUE_CONCURRENCY
+    for queue in candidates:
+        next_job = due.filter(queue=queue).order_by('run_at', 'id')
+        limit = limits.get(queue)
+        if limit is not None:
+            running = (Job.objects.filter(queue=OuterRef('queue'), status=Job.RUNNING)
+                       .order_by().values('queue').annotate(count=Count('id')).values('count'))
+            next_job = next_job.annotate(running=Coalesce(Subquery(running), 0)).filter(running__lt=limit)
+
+        claim = uuid.uuid4().hex
+        if Job.objects.filter(pk=Subquery(next_job.values('pk')[:1]), status=Job.QUEUED).update(
+                status=Job.RUNNING, claim=claim, worker=worker_name(), started_at=now,
+                heartbeat_at=now, attempts=F('attempts') + 1):
+            return Job.objects.get(claim=claim)
+    return None
+
+
+def retry_delay(attempts):
+    """Seconds before the next try: exponential backoff with jitter, capped."""
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+@contextmanager
+def heartbeat(job):
+    """Refresh the heartbeat of a running job from a thread, so its lease does not expire."""
+    from .models import Job
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            try:
+                Job.objects.filter(pk=job.pk, claim=job.claim).update(heartbeat_at=timezone.now())
+            except Exception as e:
+                print(f"Failed to record the heartbeat of job {job.pk}: {e}")
+        connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def fail_or_retry(job, error, message):
+    """
+    Queue a job that did not finish again after a backoff delay, or give it
+    up once its attempts are used up. Only acts while the job still holds
+    its claim, i.e. was not released and claimed again meanwhile.
+
+    Returns:
+        bool: Whether the job was changed
+    """
+    from .models import Job
+
+    claimed = Job.objects.filter(pk=job.pk, status=Job.RUNNING, claim=job.claim)
+    if job.attempts < job.max_attempts:
+        return bool(claimed.update(
+            status=Job.QUEUED, last_error=error, claim='',
+            run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts))))
+
+    if not claimed.update(status=Job.FAILED, last_error=error, finished_at=timezone.now()):
+        return False
+    print(f"Failed to run job {job.pk} ({job.task}): {message}")
+    try:
+        on_give_up = getattr(import_string(job.task), 'job_on_give_up', None)
+        if on_give_up:
+            on_give_up(job, message)
+    except Exception as e:
+        print(f"Failed to clean up after job {job.pk}: {e}")
+    return True
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome, retrying failures while attempts are left."""
+    from core.instrumentation.metrics import track_queue_job
+    from .models import Job
+
+    try:
+        func = import_string(job.task)
+        if not hasattr(func, 'job_queue'):
+            raise ValueError(f"{job.task} is not a task")
+        with heartbeat(job), track_queue_job(job.queue, job.task):
+            func(*job.args, **job.kwargs)
+    except Exception as e:
+        fail_or_retry(job, ''.join(traceback.format_exception(e)), str(e))
+        return False
+
+    Job.objects.filter(pk=job.pk, claim=job.claim).update(status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def process_exists(pid):
+    """
+    Whether a process with this id runs on this host. Always assumed on
+    Windows, where os.kill() would terminate the process instead of probing it.
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def release_abandoned_jobs(dead=()):
+    """
+    Put back running jobs whose worker is gone (e.g. killed mid-job or on
+    a host that no longer exists), counting the run as a failed attempt.
+    A worker is gone when it is known to have exited, when it ran on this
+    host and its process no longer exists, or when it has not refreshed
+    the job's heartbeat for JOB_LEASE_TIMEOUT seconds.
+
+    Args:
+        dead (iterable): Worker names known to have exited
+    """
+    from .models import Job
+
+    host = f"{socket.gethostname()}:"
+    expired = timezone.now() - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+    lease_expired = Q(heartbeat_at__lt=expired) | Q(heartbeat_at__isnull=True, started_at__lt=expired)
+    dead = set(dead)
+    released = 0
+    for job in Job.objects.filter(lease_expired | Q(worker__in=dead) | Q(worker__startswith=host),
+                                  status=Job.RUNNING):
+        expired_lease = (job.heartbeat_at or job.started_at or expired) <= expired
+        if not expired_lease and job.worker not in dead:
+            if process_exists(int(job.worker.rsplit(':', 1)[1])):
+                continue  # Still running, in this or another worker pool
+        if expired_lease and job.worker not in dead:
+            error = f"Worker {job.worker} stopped refreshing the job's heartbeat"
+        else:
+            error = f"Worker {job.worker} exited while running the job"
+        released += fail_or_retry(job, error, error)
+    return released
+
+
+def delete_finished_jobs():
+    """Remove finished jobs older than JOB_RETENTION_DAYS; failed jobs are kept for inspection."""
+    from .models import Job
+
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def work(queues=None, should_stop=lambda: False):
+    """Claim and run jobs until `should_stop()` returns True."""
+    while not should_stop():
+        close_old_connections()
+        try:
+            job = claim_job(queues)
+        except Exception as e:
+            print(f"Failed to claim a job: {e}")
+            job = None
+        if job is None:
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        run_job(job)
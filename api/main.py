@@ -1,5 +1,5 @@
 # Standard library imports
-# None required
+import math
 
 # Django imports
 from django.contrib.admin.views.decorators import staff_member_required
@@ -7,13 +7,14 @@ from django.contrib.admin.views.decorators import staff_member_required
 # Third-party imports
 import orjson
 from ninja import NinjaAPI
+from ninja.errors import Throttled
 from ninja.parser import Parser
 from ninja.renderers import BaseRenderer
-from ninja.throttling import AnonRateThrottle, AuthRateThrottle
 
 # Local imports
 from .public_routers import router as public_router
 from .private_routers import router as private_router
+from .throttling import SharedAnonRateThrottle, SharedAuthRateThrottle
 
 
 class ORJSONParser(Parser):
@@ -63,10 +64,10 @@ app = NinjaAPI(
     parser=ORJSONParser(),
     renderer=ORJSONRenderer(),
 
-    # Throttling public and private endpoints
+    # Throttling public and private endpoints, shared by all workers on the host
     throttle=[
-        AnonRateThrottle('10/s'),
-        AuthRateThrottle('100/s'),
+        SharedAnonRateThrottle('10/s'),
+        SharedAuthRateThrottle('100/s'),
     ],
     
     # Restrict API documentation access to staff members only
@@ -78,6 +79,15 @@ app = NinjaAPI(
     version="v1"
 )
 
+@app.exception_handler(Throttled)
+def throttled(request, exc):
+    """Tell throttled clients when a request will be allowed again."""
+    response = app.create_response(request, {"detail": "Too many requests."}, status=429)
+    if exc.wait is not None:
+        response["Retry-After"] = str(math.ceil(exc.wait))
+    return response
+
+
 # Register routers with their respective URL prefixes
 app.add_router("public/", public_router)   # Public endpoints
 app.add_router("private/", private_router) # Private/authenticated endpoints
\ No newline at end of file
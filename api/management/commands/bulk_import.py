@@ -0,0 +1,38 @@
+# Import necessary modules
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import count_rows, import_csv
+from api.models import ImportJob
+
+# Management command to bulk import a CSV file from the shell, the same way
+# admin import jobs do, e.g. for catalogs too large to upload through a browser.
+class Command(BaseCommand):
+    help = "Imports a CSV file into a catalog model in chunks with bulk writes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=[name for name, _ in ImportJob.MODEL_CHOICES])
+        parser.add_argument('file', help='CSV file laid out like the admin CSV export')
+        parser.add_argument('--chunk-size', type=int, help='Rows per chunk (default: IMPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        model = apps.get_model('api', options['model'])
+        try:
+            file = open(options['file'], 'rb')
+        except OSError as e:
+            raise CommandError(e)
+
+        with file:
+            total = count_rows(file)
+
+            def report(totals):
+                self.stdout.write(f"{totals['processed']:,} / {total:,} rows", ending='\r')
+                self.stdout.flush()
+
+            totals = import_csv(model, file, chunk_size=options['chunk_size'], on_chunk=report)
+
+        for error in totals['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['processed']:,} rows: {totals['created']:,} created, "
+            f"{totals['updated']:,} updated, {totals['failed']:,} failed."))
@@ -0,0 +1,69 @@
+# Import necessary modules
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.imaging import render_variants
+from api.models import ProductImage
+from api.renditions import read_original, rendition_options, store_renditions
+
+# Management command to (re)render product image variants in parallel.
+# Uploads are rendered in the background already; run this after changing
+# the rendition settings, or to catch up on images a restarted worker missed.
+class Command(BaseCommand):
+    help = "Renders the resized WebP/AVIF variants of product images in a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render every image, not only those without current renditions')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Render processes (default: number of CPUs)')
+
+    def handle(self, *args, **options):
+        widths, formats, quality = rendition_options()
+        if not formats:
+            self.stdout.write(self.style.ERROR(
+                f"Pillow cannot encode any of {', '.join(settings.IMAGE_RENDITION_FORMATS)}."))
+            return
+
+        images = ProductImage.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            images = images.exclude(renditions_source=F('image'))
+
+        rendered = failed = 0
+        pending = {}
+        workers = max(1, options['workers'])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def collect(done):
+                nonlocal rendered, failed
+                for future in done:
+                    image, source = pending.pop(future)
+                    try:
+                        store_renditions(image, source, future.result())
+                        rendered += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"Image {image.pk} ({source}): {e}")
+
+            for image in images.iterator(chunk_size=200):
+                try:
+                    data = read_original(image)
+                except OSError as e:
+                    failed += 1
+                    self.stderr.write(f"Image {image.pk} ({image.image.name}): {e}")
+                    continue
+                future = executor.submit(render_variants, data, widths, formats, quality)
+                pending[future] = (image, image.image.name)
+                # Keep originals of only a few images per worker in memory
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} images as {', '.join(formats)}, {failed} failed."))
@@ -0,0 +1,14 @@
+# Import necessary modules
+from django.core.management.base import BaseCommand
+
+from api.search import rebuild_search_index
+
+# Management command to rebuild the product full-text search index.
+# The index is keyed on the Products rowid, so run this after restoring a
+# backup or running VACUUM, both of which may renumber rows.
+class Command(BaseCommand):
+    help = "Drops and rebuilds the SQLite FTS5 product search index"
+
+    def handle(self, *args, **kwargs):
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt with {total} products."))
@@ -0,0 +1,14 @@
+# Import necessary modules
+from django.core.management.base import BaseCommand
+
+from api.models import DashboardMetrics, recalculate_stock_totals
+
+# Management command to repair Product.stock_quantity drift
+class Command(BaseCommand):
+    help = "Recomputes every product's stock total from the Stock table in a single grouped update"
+
+    def handle(self, *args, **kwargs):
+        updated = recalculate_stock_totals()
+        if updated:
+            DashboardMetrics.mark_dirty('products')
+        self.stdout.write(self.style.SUCCESS(f"Stock totals reconciled, {updated} products corrected."))
@@ -1,25 +1,44 @@
 # Import necessary modules
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
 from django_apscheduler.jobstores import DjangoJobStore
 from django_apscheduler.models import DjangoJobExecution
 from django_apscheduler import util
 from djmoney.contrib.exchange.backends import OpenExchangeRatesBackend
+from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+import signal
+import sys
+
+from api.models import Tombstone
+from api.dashboard import refresh_dashboard_metrics
+from api.rates import recalculate_base_prices
+from core.instrumentation.metrics import track_job
 
 # Function to update exchange rates
 def sync_exchange_rates():
     try:
-        backend = OpenExchangeRatesBackend()  # Initialize the exchange rates backend
-        backend.update_rates()  # Update rates from OpenExchangeRates
+        with track_job('sync_exchange_rates'):
+            backend = OpenExchangeRatesBackend()  # Initialize the exchange rates backend
+            backend.update_rates()  # Update rates from OpenExchangeRates
         print("Exchange rates updated successfully.")
     except Exception as e:
         print(f"Failed to update exchange rates: {e}")
 
+    # Re-express every price in the base currency, with whatever rates are stored
+    try:
+        recalculate_base_prices()
+    except Exception as e:
+        print(f"Failed to recalculate base currency prices: {e}")
+
 # Function to backup db
 def backup_db_every_month():
     try:
-        call_command('dbbackup', clean=True)
+        with track_job('db_backup'):
+            call_command('dbbackup', clean=True)
         print("Database backed up successfully.")
     except Exception as e:
         print(f"An error occurred during database backup: {e}")
@@ -27,7 +46,8 @@ def backup_db_every_month():
 # Funtion to backup media
 def backup_media_every_month():
     try:
-        call_command('mediabackup', clean=True)
+        with track_job('media_backup'):
+            call_command('mediabackup', clean=True)
         print("Media files backed up successfully.")
     except Exception as e:
         print(f"An error occurred during media backup: {e}")
@@ -37,9 +57,25 @@ def backup_media_every_month():
 def delete_old_job_executions(max_age=7):
     DjangoJobExecution.objects.delete_old_job_executions(max_age)  # Delete jobs older than 'max_age' days
 
-# Function to start the scheduler
+# Function to delete change feed tombstones past their retention window
+@util.close_old_connections
+def delete_old_tombstones(max_age=None):
+    if max_age is None:
+        max_age = settings.CHANGE_FEED_TOMBSTONE_MAX_AGE
+    Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=max_age)).delete()
+
+# Function to recompute the dashboard metrics flagged as stale by recent writes
+@util.close_old_connections
+def refresh_dashboard():
+    try:
+        with track_job('refresh_dashboard_metrics'):
+            refresh_dashboard_metrics()
+    except Exception as e:
+        print(f"Failed to refresh dashboard metrics: {e}")
+
+# Function to start the scheduler; blocks until the process is interrupted
 def start():
-    scheduler = BackgroundScheduler()  # Create a background scheduler
+    scheduler = BlockingScheduler()  # Runs jobs until interrupted, so the command keeps the process alive
     scheduler.add_jobstore(DjangoJobStore(), "default")  # Use Django's database as the job store
 
     # Add a job to update exchange rates every hour
@@ -80,10 +116,34 @@ def start():
         replace_existing=True,
     )
 
+    # Add a job to delete expired change feed tombstones every day
+    scheduler.add_job(
+        delete_old_tombstones,
+        'interval',
+        days=1,
+        jobstore='default',
+        id="delete_old_tombstones",
+        replace_existing=True,
+    )
+
+    # Add a job to refresh the dashboard metrics snapshot
+    scheduler.add_job(
+        refresh_dashboard,
+        'interval',
+        seconds=settings.DASHBOARD_METRICS_REFRESH_SECONDS,
+        jobstore='default',
+        id="refresh_dashboard_metrics",
+        replace_existing=True,
+    )
+
+    sync_exchange_rates()  # Perform an initial sync of exchange rates
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # Shut down cleanly on SIGTERM too
     try:
-        scheduler.start()  # Start the scheduler
         print("Scheduler started successfully.")
-        sync_exchange_rates()  # Perform an initial sync of exchange rates
+        scheduler.start()  # Start the scheduler
+    except (KeyboardInterrupt, SystemExit):
+        scheduler.shutdown()
+        print("Scheduler stopped.")
     except Exception as e:
         print(f"Failed to start scheduler: {e}")
 
@@ -0,0 +1,100 @@
+# Import necessary modules
+import multiprocessing
+import signal
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import delete_finished_jobs, release_abandoned_jobs, work, worker_name
+
+# Seconds between the supervisor's housekeeping rounds
+HOUSEKEEPING_INTERVAL = 3600
+
+
+def run_worker(queues):
+    """Entry point of a worker process: run jobs until asked to stop with SIGTERM."""
+    django.setup()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    # The supervisor handles Ctrl+C and passes it on as SIGTERM, so the current job can finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop)
+    work(queues, lambda: stopping)
+
+
+# Management command to run the background job queue. It starts a number of
+# worker processes, restarts any that die and puts their unfinished jobs back,
+# along with jobs of any host whose heartbeat lease expired.
+class Command(BaseCommand):
+    help = "Runs queued background jobs (imports, image renditions, file cleanup) in worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Worker processes (default: JOB_WORKER_PROCESSES)')
+        parser.add_argument('--queues', help='Comma-separated queues to work on (default: all)')
+
+    def handle(self, *args, **options):
+        queues = [queue.strip() for queue in options['queues'].split(',')] if options['queues'] else None
+        context = multiprocessing.get_context('spawn')
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        released = release_abandoned_jobs()
+        if released:
+            self.stdout.write(f"Put back {released} jobs of workers that exited.")
+        connections.close_all()
+
+        def start():
+            process = context.Process(target=run_worker, args=(queues,), daemon=True)
+            process.start()
+            return process
+
+        processes = [start() for _ in range(max(1, options['processes']))]
+        self.stdout.write(self.style.SUCCESS(
+            f"Started {len(processes)} workers on {', '.join(queues) if queues else 'all queues'}."))
+
+        housekeeping = released_at = 0
+        while not stopping:
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    self.stderr.write(f"Worker {process.pid} exited with code {process.exitcode}, restarting it.")
+                    processes[index] = start()
+                    release_abandoned_jobs(dead=[worker_name(process.pid)])
+            if time.monotonic() - released_at > settings.JOB_HEARTBEAT_INTERVAL:
+                try:
+                    release_abandoned_jobs()
+                except Exception as e:
+                    print(f"Failed to release abandoned jobs: {e}")
+                released_at = time.monotonic()
+            if time.monotonic() - housekeeping > HOUSEKEEPING_INTERVAL:
+                try:
+                    delete_finished_jobs()
+                except Exception as e:
+                    print(f"Failed to delete finished jobs: {e}")
+                housekeeping = time.monotonic()
+            connections.close_all()
+            time.sleep(1)
+
+        self.stdout.write("Stopping workers...")
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + settings.JOB_SHUTDOWN_TIMEOUT
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        release_abandoned_jobs(dead=[worker_name(process.pid) for process in processes])
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:44
+
+import api.models
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('product', 'Products'), ('category', 'Categories'), ('supplier', 'Suppliers'), ('productsupplier', 'Product Suppliers'), ('productimage', 'Product Images'), ('warehouse', 'Warehouses'), ('stock', 'Stocks')], max_length=50)),
+                ('file', models.FileField(help_text='CSV file laid out like the CSV export: field names as headers, related objects by id', storage=api.models.import_storage, upload_to='imports/', validators=[django.core.validators.FileExtensionValidator(['csv'])])),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', editable=False, max_length=20)),
+                ('total_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('processed_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('updated_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('failed_rows', models.PositiveIntegerField(default=0, editable=False)),
+                ('errors', models.JSONField(blank=True, default=list, editable=False)),
+                ('message', models.TextField(blank=True, default='', editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_by', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Import Jobs',
+                'db_table': 'Import Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
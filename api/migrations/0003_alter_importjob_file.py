@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-17 12:51
+
+import api.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(help_text='CSV file laid out like the CSV export: field names as headers, related objects by id', storage=api.models.import_storage, upload_to='%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(['csv'])]),
+        ),
+    ]
@@ -1,19 +1,37 @@
 # Standard library imports
-import os
+import re
 import secrets
 import string
 import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 # Django imports
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import post_delete
+from django.core.files.storage import FileSystemStorage
+from django.core.validators import FileExtensionValidator
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 # Third-party imports
+from djmoney.contrib.exchange.models import ExchangeBackend, Rate
 from djmoney.models.fields import MoneyField
 from fastnanoid import generate
 
+# Local imports
+from .cache import invalidate_api_key
+from .rates import base_price_amount
+from .jobs import enqueue
+from .renditions import delete_files, schedule_renditions
+from .versions import bump_versions
+
 # Custom utility functions
 def generate_nanoid():
     """Generate a unique NanoID string of length 21."""
@@ -58,6 +76,7 @@ class Product(models.Model):
     sku = models.CharField(max_length=150, unique=True)
     description = models.TextField(blank=True, null=True)
     price = MoneyField(max_digits=14, decimal_places=2, default_currency='USD')
+    price_base_amount = models.DecimalField(max_digits=20, decimal_places=4, null=True, blank=True, editable=False)
     stock_quantity = models.IntegerField(default=0, editable=False)
     is_active = models.BooleanField(default=False)
     categories = models.ManyToManyField('Category', related_name='products')
@@ -71,8 +90,21 @@ class Product(models.Model):
             models.Index(fields=['id']),
             models.Index(fields=['name']),
             models.Index(fields=['sku']),
+            models.Index(fields=['updated_at', 'id']),  # Keyset pagination
+            models.Index(fields=['price_base_amount', 'id']),  # Price filters and sorting
         ]
 
+    def save(self, *args, **kwargs):
+        """
+        Override save method to keep the price in PRICE_BASE_CURRENCY
+        in step with the price and its currency.
+        """
+        self.price_base_amount = base_price_amount(self.price)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'price_currency'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'price_base_amount'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.sku
 
@@ -84,6 +116,7 @@ class Category(models.Model):
     id = NanoIDField(primary_key=True)
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'Categories'
@@ -91,6 +124,7 @@ class Category(models.Model):
         indexes = [
             models.Index(fields=['id']),
             models.Index(fields=['name']),
+            models.Index(fields=['updated_at', 'id']),  # Change feed
         ]
 
     def __str__(self):
@@ -147,6 +181,10 @@ class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='product_images/')
     alt_text = models.CharField(max_length=255, blank=True, null=True)
+    # Resized WebP/AVIF variants, rendered in the background (see api.renditions)
+    renditions = models.JSONField(default=list, blank=True, editable=False)
+    renditions_source = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                         help_text="Image file the renditions were rendered from")
 
     class Meta:
         db_table = 'Product Images'
@@ -155,12 +193,27 @@ class ProductImage(models.Model):
     def __str__(self):
         return str(self.id)
 
+    @property
+    def renditions_stale(self):
+        """Whether the renditions are missing or were rendered from another file."""
+        return bool(self.image) and self.renditions_source != self.image.name
+
+
+@receiver(post_save, sender=ProductImage)
+def schedule_image_renditions(sender, instance, **kwargs):
+    """Queue the rendering of a new or replaced image; workers see it once the upload commits."""
+    if instance.renditions_stale:
+        schedule_renditions(instance.pk)
+
 
 @receiver(post_delete, sender=ProductImage)
 def delete_image_file(sender, instance, **kwargs):
-    """Signal handler to clean up image files when a ProductImage instance is deleted."""
-    if instance.image and os.path.isfile(instance.image.path):
-        os.remove(instance.image.path)
+    """Signal handler to queue the removal of a deleted image's files."""
+    names = [rendition['name'] for rendition in instance.renditions]
+    if instance.image:
+        names.append(instance.image.name)
+    if names:
+        enqueue(delete_files, names)
 
 
 class Warehouse(models.Model):
@@ -183,6 +236,129 @@ class Warehouse(models.Model):
         return self.name
 
 
+# Stock total helpers
+STOCK_TOTALS_BATCH_SIZE = 500
+
+# Product ids whose totals are recomputed when the active `deferred_stock_totals` block exits
+_pending_stock_totals = ContextVar('pending_stock_totals', default=None)
+
+
+def recalculate_stock_totals(product_ids=None):
+    """
+    Recompute Product.stock_quantity from the Stock table with one grouped
+    UPDATE per batch, writing only products whose stored total is wrong.
+
+    Args:
+        product_ids (iterable): Products to refresh (default: all products)
+
+    Returns:
+        int: Number of products whose total changed
+    """
+    totals = (Stock.objects.filter(product=OuterRef('pk'))
+              .order_by()
+              .values('product')
+              .annotate(total=Sum('quantity'))
+              .values('total'))
+    computed = Coalesce(Subquery(totals), 0)
+
+    if product_ids is None:
+        return Product.objects.exclude(stock_quantity=computed).update(stock_quantity=computed)
+
+    product_ids = list(product_ids)
+    updated = 0
+    for start in range(0, len(product_ids), STOCK_TOTALS_BATCH_SIZE):
+        batch = product_ids[start:start + STOCK_TOTALS_BATCH_SIZE]
+        updated += (Product.objects.filter(pk__in=batch)
+                    .exclude(stock_quantity=computed)
+                    .update(stock_quantity=computed))
+    return updated
+
+
+def apply_stock_deltas(deltas):
+    """
+    Shift Product.stock_quantity by per-product deltas with F() updates,
+    or queue the products for recomputation inside `deferred_stock_totals`.
+    Only the stock_quantity column is written, so updated_at is left alone.
+    """
+    pending = _pending_stock_totals.get()
+    if pending is not None:
+        pending.update(deltas)
+        return
+
+    for product_id, delta in deltas.items():
+        if delta:
+            Product.objects.filter(pk=product_id).update(stock_quantity=F('stock_quantity') + delta)
+
+
+@contextmanager
+def deferred_stock_totals():
+    """
+    Collect every product touched by stock writes inside the block and
+    recompute their totals once on exit, instead of once per row.
+    Nested blocks share the outermost collection.
+    """
+    pending = _pending_stock_totals.get()
+    if pending is not None:
+        yield pending
+        return
+
+    pending = set()
+    token = _pending_stock_totals.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending_stock_totals.reset(token)
+    recalculate_stock_totals(pending)
+    if pending:
+        # Bulk stock writes bypass the per-row signals flagging the dashboard
+        DashboardMetrics.mark_dirty('products', 'stock')
+
+
+class StockQuerySet(models.QuerySet):
+    """
+    QuerySet keeping Product.stock_quantity in sync for bulk writes,
+    which bypass Stock.save().
+    """
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db), deferred_stock_totals() as pending:
+            objs = super().bulk_create(objs, *args, **kwargs)
+            pending.update(obj.product_id for obj in objs)
+            # Upserts (update_conflicts) can move loaded rows to another product
+            pending.update(obj._stored_stock[0] for obj in objs if hasattr(obj, '_stored_stock'))
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # Bump updated_at so the rows show up in the change feed
+        objs = list(objs)
+        if 'updated_at' not in fields:
+            now = timezone.now()
+            for obj in objs:
+                obj.updated_at = now
+            fields = [*fields, 'updated_at']
+
+        # bulk_update() issues queryset updates, which record the affected products
+        with transaction.atomic(using=self.db), deferred_stock_totals():
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        if not {'quantity', 'product', 'product_id'} & kwargs.keys():
+            return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db), deferred_stock_totals() as pending:
+            pending.update(self.values_list('product_id', flat=True))
+            rows = super().update(**kwargs)
+            product = kwargs.get('product_id', kwargs.get('product'))
+            if product is not None:
+                pending.add(getattr(product, 'pk', product))
+        return rows
+
+    def delete(self):
+        # Per-row post_delete signals record the affected products
+        with transaction.atomic(using=self.db), deferred_stock_totals():
+            return super().delete()
+
+
 class Stock(models.Model):
     """
     Tracks product inventory levels across different warehouses.
@@ -191,29 +367,188 @@ class Stock(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=0)
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StockQuerySet.as_manager()
 
     class Meta:
         db_table = 'Stocks'
         verbose_name_plural = 'Stocks'
         indexes = [
-            models.Index(fields=['id'])
+            models.Index(fields=['id']),
+            models.Index(fields=['product', 'warehouse']),
+            models.Index(fields=['updated_at', 'id']),  # Change feed
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stored product and quantity so save() can apply a delta."""
+        instance = super().from_db(db, field_names, values)
+        instance._stored_stock = (instance.__dict__.get('product_id'), instance.__dict__.get('quantity'))
+        return instance
+
     def save(self, *args, **kwargs):
         """
-        Override save method to update the total stock quantity in the Product model
-        whenever stock levels change.
+        Override save method to shift the total stock quantity in the Product model
+        by the change in this row, instead of re-aggregating every warehouse.
         """
-        super().save(*args, **kwargs)
-        total_quantity = Stock.objects.filter(product=self.product).aggregate(
-            total=models.Sum('quantity'))['total']
-        self.product.stock_quantity = total_quantity if total_quantity else 0
-        self.product.save()
+        stored_product_id, stored_quantity = getattr(self, '_stored_stock', (None, None))
+        adding = self._state.adding
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if isinstance(self.quantity, Combinable) or (
+                    not adding and None in (stored_product_id, stored_quantity)):
+                # Expression or partially loaded row: the delta is unknown, so recompute
+                self.refresh_from_db(fields=['product', 'quantity'])
+                with deferred_stock_totals() as pending:
+                    pending.update({stored_product_id, self.product_id} - {None})
+            else:
+                deltas = Counter({self.product_id: self.quantity})
+                if stored_product_id is not None:
+                    deltas[stored_product_id] -= stored_quantity
+                apply_stock_deltas(deltas)
+
+        self._stored_stock = (self.product_id, self.quantity)
 
     def __str__(self):
         return str(self.id)
 
 
+@receiver(post_delete, sender=Stock)
+def subtract_deleted_stock(sender, instance, **kwargs):
+    """Signal handler to remove a deleted stock row from its product's total."""
+    apply_stock_deltas({instance.product_id: -instance.quantity})
+
+
+class Tombstone(models.Model):
+    """
+    Records deleted catalog rows so change feeds can report deletions.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'Tombstones'
+        verbose_name_plural = 'Tombstones'
+        indexes = [
+            models.Index(fields=['model', 'deleted_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}"
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Stock)
+def record_tombstone(sender, instance, **kwargs):
+    """Signal handler to leave a tombstone for change feed consumers."""
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=str(instance.pk))
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def touch_recategorized_products(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler to bump updated_at on products whose categories changed,
+    so category membership changes reach the product change feed.
+    """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_product_ids = list(instance.products.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_product_ids', [])
+    else:
+        product_ids = pk_set
+    Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_table_version(sender, **kwargs):
+    """Signal handler to invalidate ETags and cached responses built from a changed table."""
+    if sender._meta.app_label == 'api':
+        bump_versions(sender._meta.model_name)
+
+
+@receiver(post_save, sender=ExchangeBackend)
+@receiver(post_save, sender=Rate)
+def bump_rate_version(sender, **kwargs):
+    """Signal handler to make every worker reload its exchange rate matrix after a rate sync."""
+    bump_versions('rate')
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def bump_product_category_version(sender, action, **kwargs):
+    """Signal handler to invalidate product listings when category membership changes."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_versions('product')
+
+
+class DashboardMetrics(models.Model):
+    """
+    Single-row snapshot of the admin dashboard figures.
+    Writes only flag the affected sections as dirty; the scheduler recomputes
+    dirty sections in the background, so the dashboard reads one row.
+    """
+    SECTIONS = ('products', 'stock', 'categories')
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1, editable=False)
+    total_products = models.PositiveIntegerField(default=0)
+    active_products = models.PositiveIntegerField(default=0)
+    low_stock_products = models.PositiveIntegerField(default=0)
+    total_stock_value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_stock_items = models.BigIntegerField(default=0)
+    category_distribution = models.JSONField(default=list)
+    products_dirty = models.BooleanField(default=True)
+    stock_dirty = models.BooleanField(default=True)
+    categories_dirty = models.BooleanField(default=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'DashboardMetrics'
+        verbose_name_plural = 'Dashboard Metrics'
+
+    @classmethod
+    def mark_dirty(cls, *sections):
+        """Flag snapshot sections as stale, in the caller's transaction."""
+        cls.objects.filter(pk=1).update(**{f'{section}_dirty': True for section in sections})
+
+    def __str__(self):
+        return f"Dashboard metrics at {self.computed_at}"
+
+
+@receiver([post_save, post_delete], sender=Product)
+def mark_product_metrics_dirty(sender, created=True, **kwargs):
+    """Signal handler to flag product figures, and the category split when rows come or go."""
+    if created:
+        DashboardMetrics.mark_dirty('products', 'categories')
+    else:
+        DashboardMetrics.mark_dirty('products')
+
+
+@receiver([post_save, post_delete], sender=Stock)
+def mark_stock_metrics_dirty(sender, **kwargs):
+    """Signal handler to flag stock figures after a stock row changes."""
+    DashboardMetrics.mark_dirty('products', 'stock')
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver(m2m_changed, sender=Product.categories.through)
+def mark_category_metrics_dirty(sender, action='post_save', **kwargs):
+    """Signal handler to flag the category split after category or membership changes."""
+    if action in ('post_save', 'post_add', 'post_remove', 'post_clear'):
+        DashboardMetrics.mark_dirty('categories')
+
+
 class APIKey(models.Model):
     """
     Manages API authentication keys for external access to the system.
@@ -222,6 +557,10 @@ class APIKey(models.Model):
     api_key = models.CharField(max_length=100, unique=True, editable=False)
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
+    rate_limit = models.CharField(
+        max_length=20, blank=True, null=True,
+        help_text="Requests allowed per period for this key, e.g. 500/s or 10000/h. Empty uses the default."
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -243,9 +582,11 @@ class APIKey(models.Model):
         super().save(*args, **kwargs)
 
     def clean(self):
-        """Ensure the API key has a name."""
+        """Ensure the API key has a name and a well-formed rate limit."""
         if not self.name:
             raise ValidationError({'name': 'Name is required'})
+        if self.rate_limit and not re.fullmatch(r'[1-9]\d*/[smhd]', self.rate_limit):
+            raise ValidationError({'rate_limit': 'Use <requests>/<s|m|h|d>, e.g. 500/s'})
 
     def __str__(self):
         return f"{self.name} - {self.api_key[:12]}..."
@@ -259,6 +600,12 @@ class APIKey(models.Model):
         return api_key
 
 
+@receiver([post_save, post_delete], sender=APIKey)
+def invalidate_cached_api_key(sender, instance, **kwargs):
+    """Signal handler to drop a changed or deleted API key from the verification cache."""
+    invalidate_api_key(instance.api_key)
+
+
 class Organization(models.Model):
     """
     Stores organization details and their associated API keys.
@@ -280,4 +627,122 @@ class Organization(models.Model):
 
     def __str__(self):
         return str(self.id)
-        
\ No newline at end of file
+        
+
+
+def import_storage():
+    """Storage of uploaded import files, outside MEDIA_ROOT so they are never served."""
+    return FileSystemStorage(location=settings.IMPORT_ROOT)
+
+
+class ImportJob(models.Model):
+    """
+    A bulk import of a CSV file into a catalog model, run in the background
+    a chunk at a time (see api.imports). Progress is recorded after every chunk.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    MODEL_CHOICES = [
+        ('product', 'Products'),
+        ('category', 'Categories'),
+        ('supplier', 'Suppliers'),
+        ('productsupplier', 'Product Suppliers'),
+        ('productimage', 'Product Images'),
+        ('warehouse', 'Warehouses'),
+        ('stock', 'Stocks'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    model = models.CharField(max_length=50, choices=MODEL_CHOICES)
+    file = models.FileField(
+        upload_to='%Y/%m/%d/', storage=import_storage,
+        validators=[FileExtensionValidator(['csv'])],
+        help_text="CSV file laid out like the CSV export: field names as headers, related objects by id"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, editable=False)
+    total_rows = models.PositiveIntegerField(default=0, editable=False)
+    processed_rows = models.PositiveIntegerField(default=0, editable=False)
+    created_rows = models.PositiveIntegerField(default=0, editable=False)
+    updated_rows = models.PositiveIntegerField(default=0, editable=False)
+    failed_rows = models.PositiveIntegerField(default=0, editable=False)
+    errors = models.JSONField(default=list, blank=True, editable=False)
+    message = models.TextField(blank=True, default='', editable=False)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                   null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        db_table = 'Import Jobs'
+        verbose_name_plural = 'Import Jobs'
+        ordering = ['-created_at']
+
+    @property
+    def percent_done(self):
+        """Share of the file processed so far, in percent."""
+        if self.status == self.DONE:
+            return 100
+        return min(99, self.processed_rows * 100 // self.total_rows) if self.total_rows else 0
+
+    def __str__(self):
+        return f"{self.get_model_display()} import {self.id}"
+
+
+@receiver(post_delete, sender=ImportJob)
+def delete_import_file(sender, instance, **kwargs):
+    """Signal handler to remove the uploaded file of a deleted import job."""
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+class Job(models.Model):
+    """
+    A queued call of a task function, run by the `worker` command (see api.jobs).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=200, help_text="Dotted path of the task function")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not run before this time")
+    claim = models.CharField(max_length=32, blank=True, default='', editable=False)
+    worker = models.CharField(max_length=100, blank=True, default='', editable=False)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last sign of life of the running worker")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'Jobs'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at', 'id']),  # Claiming the next due job
+            models.Index(fields=['claim']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.id})"
@@ -0,0 +1,174 @@
+# Python standard library imports
+import base64
+import binascii
+from typing import Any, List, Optional
+
+# Django imports
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+
+# Third-party imports
+import orjson
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import AsyncPaginationBase
+
+
+def encode_cursor(values, reverse=False):
+    """Pack ordering values into an opaque, URL-safe cursor string."""
+    payload = orjson.dumps({'v': values, 'r': reverse})
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Unpack a cursor produced by `encode_cursor`.
+
+    Returns:
+        tuple: (values, reverse)
+
+    Raises:
+        HttpError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = orjson.loads(base64.urlsafe_b64decode(padded))
+        return list(payload['v']), bool(payload['r'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HttpError(400, 'Invalid cursor')
+
+
+def cursor_values(obj, fields):
+    """Read the ordering values of a model instance in cursor-friendly form."""
+    model_fields = [obj._meta.get_field(name.lstrip('-')) for name in fields]
+    return [field.value_to_string(obj) for field in model_fields]
+
+
+def flip_ordering(fields):
+    """Invert the direction of every field in an ordering."""
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in fields]
+
+
+def keyset_filter(model, fields, values, reverse=False):
+    """
+    Build a filter selecting rows strictly after (or before) `values` in the
+    order of `fields`, where a leading '-' marks a descending field. The
+    leading `>=`/`<=` term lets SQLite use a composite index range scan
+    instead of evaluating the OR for every row.
+    """
+    if len(values) != len(fields):
+        raise HttpError(400, 'Invalid cursor')
+
+    names = [name.lstrip('-') for name in fields]
+    try:
+        values = [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+    except (FieldDoesNotExist, DjangoValidationError):
+        raise HttpError(400, 'Invalid cursor')
+    if None in values:
+        raise HttpError(400, 'Invalid cursor')
+
+    # Walking a descending field forwards, or an ascending one backwards, means "less than"
+    backwards = [name.startswith('-') != reverse for name in fields]
+
+    condition = Q()
+    for position, name in enumerate(names):
+        equal = {names[i]: values[i] for i in range(position)}
+        op = 'lt' if backwards[position] else 'gt'
+        condition |= Q(**equal, **{f'{name}__{op}': values[position]})
+
+    leading = {f"{names[0]}__{'lte' if backwards[0] else 'gte'}": values[0]}
+    return Q(**leading) & condition
+
+
+class CursorPagination(AsyncPaginationBase):
+    """
+    Opt-in keyset pagination over a stable, indexed ordering.
+
+    Without a `cursor` parameter the endpoint behaves exactly like
+    PageNumberPagination. Passing `cursor` (empty for the first page) switches
+    to keyset mode: rows are ordered by `ordering`, no COUNT(*) is run and the
+    response carries opaque `next`/`previous` cursors, so every page costs the
+    same as the first one.
+
+    A view may return an explicitly ordered queryset to page in another
+    order; that ordering must end in a unique field and have no NULLs.
+    Async views are paged with the async ORM.
+    """
+    class Input(Schema):
+        page: int = Field(1, ge=1)
+        cursor: Optional[str] = None
+
+    class Output(Schema):
+        items: List[Any]
+        count: Optional[int] = None
+        next: Optional[str] = None
+        previous: Optional[str] = None
+
+    def __init__(self, ordering=('id',), page_size=20, **kwargs):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        super().__init__(**kwargs)
+
+    def paginate_queryset(self, queryset, pagination: Input, **params):
+        if pagination.cursor is None:
+            offset = (pagination.page - 1) * self.page_size
+            return {
+                'items': queryset[offset:offset + self.page_size],
+                'count': self._items_count(queryset),
+            }
+
+        values, reverse = decode_cursor(pagination.cursor) if pagination.cursor else (None, False)
+        ordering = tuple(queryset.query.order_by) or self.ordering
+        return self.paginate_keyset(queryset, values, reverse, ordering)
+
+    async def apaginate_queryset(self, queryset, pagination: Input, **params):
+        """`paginate_queryset` for async views; rows are fetched with the async ORM."""
+        if pagination.cursor is None:
+            offset = (pagination.page - 1) * self.page_size
+            return {
+                'items': [obj async for obj in queryset[offset:offset + self.page_size]],
+                'count': await self._aitems_count(queryset),
+            }
+
+        values, reverse = decode_cursor(pagination.cursor) if pagination.cursor else (None, False)
+        ordering = tuple(queryset.query.order_by) or self.ordering
+        page = self._keyset_page(queryset, values, reverse, ordering)
+        return self._keyset_result([obj async for obj in page], values, reverse, ordering)
+
+    def _keyset_page(self, queryset, values, reverse, ordering):
+        """Queryset of one page after (or before) `values`, plus one row to detect more."""
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(queryset.model, ordering, values, reverse))
+        return queryset.order_by(*(flip_ordering(ordering) if reverse else ordering))[:self.page_size + 1]
+
+    def paginate_keyset(self, queryset, values=None, reverse=False, ordering=None):
+        """Fetch one page after (or before, when `reverse`) the given ordering values."""
+        ordering = tuple(ordering or self.ordering)
+        rows = list(self._keyset_page(queryset, values, reverse, ordering))
+        return self._keyset_result(rows, values, reverse, ordering)
+
+    def _keyset_result(self, rows, values, reverse, ordering):
+        # The extra row tells us whether another page exists in this direction
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            first = cursor_values(rows[0], ordering)
+            last = cursor_values(rows[-1], ordering)
+            if has_more or reverse:
+                next_cursor = encode_cursor(last)
+            if (has_more and reverse) or (values is not None and not reverse):
+                previous_cursor = encode_cursor(first, reverse=True)
+
+        return {
+            'items': rows,
+            'count': None,
+            'next': next_cursor,
+            'previous': previous_cursor,
+        }
@@ -1,9 +1,10 @@
 # Python standard library imports
-from typing import List
+from typing import List, Optional
 
 # Django imports
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import F, Q
 
 # Django Ninja imports
 from ninja import Router, Query
@@ -11,14 +12,29 @@ from ninja.security import django_auth
 from ninja.pagination import paginate, PageNumberPagination
 
 # Local imports
-from .models import Supplier, Warehouse, Stock, ProductSupplier
+from core.db.writer import run_write
+from .models import (
+    Product,
+    Supplier,
+    Warehouse,
+    Stock,
+    ProductSupplier,
+    deferred_stock_totals
+)
+from .pagination import CursorPagination
+from .changes import change_feed
+from .related import load_related
 from .schemas import (
     SupplierListSchema,
     SupplierInfoSchema,
     WarehouseListSchema,
     WarehouseInfoSchema,
     StockDetailSchema,
-    PprductSupplierDetails
+    StockMovementSchema,
+    StockMovementResultSchema,
+    StockChangeFeedSchema,
+    PprductSupplierDetails,
+    Error
 )
 
 # Initialize router
@@ -73,19 +89,125 @@ def get_warehouse(request, id: str):
             auth=django_auth, 
             response={200: List[StockDetailSchema]}, 
             tags=["Stock [Product <=> Warehouse]"])
-@paginate(PageNumberPagination, page_size=20)
+@paginate(CursorPagination, ordering=('id',), page_size=20)
+@load_related(StockDetailSchema)
 def list_stock_details(request):
-    """Get paginated list of all stock details across warehouses."""
+    """
+    Get paginated list of all stock details across warehouses.
+    Pass `cursor` (empty for the first page) to page by id instead of page number.
+    """
     stocks = Stock.objects.all()
     return stocks
 
 
+@router.get("/changes/stocks/",
+            auth=django_auth,
+            response={200: StockChangeFeedSchema, 400: Error, 410: Error},
+            tags=["Stock [Product <=> Warehouse]"])
+def list_stock_changes(request, since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1)):
+    """
+    Get stock rows changed and deleted after a watermark, oldest first.
+    Omit `since` for an initial full sync, then pass back the returned `next`.
+    """
+    return change_feed(Stock.objects.all(), since=since, limit=limit)
+
+
+@router.post("/stocks/bulk",
+             auth=django_auth,
+             response={200: List[StockMovementResultSchema], 400: Error},
+             tags=["Stock [Product <=> Warehouse]"])
+def bulk_stock_movements(request, movements: List[StockMovementSchema]):
+    """
+    Apply a batch of stock adjustments identified by (sku, warehouse_id).
+    Each row sets an absolute `quantity` or applies a relative `delta`.
+    Rows are resolved with one query per table, written with bulk upserts in a
+    single transaction, and product totals are recomputed once per product.
+    """
+    if len(movements) > settings.STOCK_BULK_MAX_ITEMS:
+        return 400, {'error': f'At most {settings.STOCK_BULK_MAX_ITEMS} movements per request'}
+
+    # Resolve SKUs, warehouses and existing stock rows up front
+    products = dict(Product.objects.filter(
+        sku__in={movement.sku for movement in movements}).values_list('sku', 'id'))
+    warehouses = set(Warehouse.objects.filter(
+        id__in={movement.warehouse_id for movement in movements}).values_list('id', flat=True))
+    existing = {}
+    for stock in Stock.objects.filter(product_id__in=products.values(),
+                                      warehouse_id__in=warehouses).order_by('id'):
+        existing.setdefault((stock.product_id, stock.warehouse_id), stock)
+
+    # Fold the movements into one pending change per stock row
+    pending = {}
+    results = []
+    for index, movement in enumerate(movements):
+        result = {'index': index, 'sku': movement.sku, 'warehouse_id': movement.warehouse_id}
+
+        if (movement.quantity is None) == (movement.delta is None):
+            error = 'Provide exactly one of quantity or delta'
+        elif movement.sku not in products:
+            error = f'Unknown SKU {movement.sku}'
+        elif movement.warehouse_id not in warehouses:
+            error = f'Unknown warehouse {movement.warehouse_id}'
+        else:
+            error = None
+        if error:
+            results.append({**result, 'status': 'error', 'error': error})
+            continue
+
+        key = (products[movement.sku], movement.warehouse_id)
+        change = pending.get(key)
+        if change is None:
+            stock = existing.get(key)
+            created = stock is None
+            if created:
+                stock = Stock(product_id=key[0], warehouse_id=key[1], quantity=0)
+            change = pending[key] = {
+                'stock': stock,
+                'created': created,
+                'absolute': created,
+                'quantity': stock.quantity,
+                'delta': 0,
+            }
+
+        if movement.quantity is not None:
+            change.update(absolute=True, quantity=movement.quantity, delta=0)
+        else:
+            change['delta'] += movement.delta
+
+        results.append({
+            **result,
+            'status': 'created' if change['created'] else 'updated',
+            'quantity': change['quantity'] + change['delta'],
+        })
+
+    # Relative-only changes to existing rows are applied with F() to stay race-free
+    to_create, to_update = [], []
+    for change in pending.values():
+        stock = change['stock']
+        if change['absolute']:
+            stock.quantity = change['quantity'] + change['delta']
+        else:
+            stock.quantity = F('quantity') + change['delta']
+        (to_create if change['created'] else to_update).append(stock)
+
+    run_write(_write_stock_changes, to_create, to_update)
+    return results
+
+
+def _write_stock_changes(to_create, to_update):
+    """Write resolved stock rows and refresh the affected product totals once."""
+    with deferred_stock_totals():
+        Stock.objects.bulk_create(to_create, batch_size=500)
+        Stock.objects.bulk_update(to_update, ['quantity'], batch_size=500)
+
+
 # Product Supplier endpoints
 @router.get("/product-supplier/", 
             auth=django_auth, 
             response={200: List[PprductSupplierDetails]}, 
             tags=["Product <=> Supplier"])
 @paginate(PageNumberPagination, page_size=20)
+@load_related(PprductSupplierDetails)
 def list_product_supplier_details(request):
     """Get paginated list of all product-supplier relationships."""
     data = ProductSupplier.objects.all()
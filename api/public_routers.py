@@ -1,21 +1,34 @@
 # Python standard library imports
-from typing import List
+from typing import List, Optional
 
 # Django imports
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.db.models import Q
 
 # Django Ninja imports
 from ninja import Router, Query
-from ninja.pagination import paginate, PageNumberPagination
+from ninja.pagination import paginate
+from ninja.errors import HttpError
 from ninja.security import APIKeyHeader
 
 # Djnago Money imports
-from djmoney.contrib.exchange.models import Rate
-from djmoney.contrib.exchange.models import convert_money
+from djmoney.contrib.exchange.exceptions import MissingRate
 
 # Local imports
 from .models import Product, ProductImage, Category, APIKey, Organization
+from .cache import verified_api_keys, rejected_api_keys
+from .pagination import CursorPagination
+from .search import search_products
+from .export import aexport_products, export_products
+from .changes import change_feed
+from .conditional import conditional, make_etag, table_validators
+from .versions import aget_versions
+from .response_cache import cache_response
+from .related import with_related
+from .rates import convert_money, convert_prices, get_rate_matrix
 from .schemas import (
     Message,
     Error,
@@ -24,9 +37,13 @@ from .schemas import (
     ProductImageSchema,
     CategorySchema,
     ProductFilterSchema,
+    ProductChangeFeedSchema,
+    CategoryChangeFeedSchema,
     OrganizationDetailSchema,
     ExchangeRateResponseSchema,
-    ProductPriceResponseSchema
+    ProductPriceResponseSchema,
+    PriceBatchRequestSchema,
+    PriceMatrixSchema
 )
 
 # Initialize router
@@ -38,20 +55,70 @@ class ApiKey(APIKeyHeader):
     param_name = "X-API-Key"
 
     def authenticate(self, request, key):
-        """Validate API key against database."""
-        try:
-            return APIKey.objects.get(api_key=key)
-        except APIKey.DoesNotExist:
-            pass
-
-# Initialize API key authentication
+        """
+        Validate API key, consulting the per-worker cache before the database.
+        Both active keys and unknown/inactive keys are cached.
+        """
+        if not key:
+            return None
+
+        api_key = verified_api_keys.get(key)
+        if api_key is not None:
+            return api_key
+        if rejected_api_keys.get(key) is not None:
+            return None
+
+        api_key = APIKey.objects.filter(api_key=key, is_active=True).first()
+        if api_key is None:
+            rejected_api_keys.set(key, True)
+            return None
+
+        verified_api_keys.set(key, api_key)
+        return api_key
+
+
+class AsyncApiKey(ApiKey):
+    """ApiKey for async views: a cache miss is looked up with the async ORM."""
+    is_async = True
+
+    async def authenticate(self, request, key):
+        if not key:
+            return None
+
+        api_key = verified_api_keys.get(key)
+        if api_key is not None:
+            return api_key
+        if rejected_api_keys.get(key) is not None:
+            return None
+
+        api_key = await APIKey.objects.filter(api_key=key, is_active=True).afirst()
+        if api_key is None:
+            rejected_api_keys.set(key, True)
+            return None
+
+        verified_api_keys.set(key, api_key)
+        return api_key
+
+# Initialize API key authentication (sync and async views)
 header_key = ApiKey()
+async_header_key = AsyncApiKey()
+
+
+async def product_validators(request, id, **kwargs):
+    """
+    ETag for a single product from one indexed lookup. Stock totals and images
+    change without touching updated_at, so they are part of the tag.
+    """
+    row = await Product.objects.filter(id=id).values_list('updated_at', 'stock_quantity').afirst()
+    if row is None:
+        return None
+    return make_etag(request.path, *row, *await aget_versions('productimage')), None
 
 # Health check endpoint
 @router.get("/health",
             response={200: Message, 204: None}, 
             tags=["Product"])
-def health_check(request):
+async def health_check(request):
     """Simple health check endpoint to verify API status."""
     return 200, {'message': 'success'}
 
@@ -60,9 +127,11 @@ def health_check(request):
 @router.get("/organization",
             response={200: OrganizationDetailSchema, 404: Error},
             tags=["Organization"])
-def get_organization_details(request):
+@conditional(table_validators('organization'))
+@cache_response('organization')
+async def get_organization_details(request):
     # Get organization from database
-    organization = Organization.objects.first()
+    organization = await Organization.objects.afirst()
 
     if organization:
         return organization
@@ -73,87 +142,160 @@ def get_organization_details(request):
 
 # Product endpoints
 @router.get("/products/", 
-            auth=header_key, 
+            auth=async_header_key, 
             response={200: List[ProductListSchema]}, 
             tags=["Product"])
-@paginate(PageNumberPagination, page_size=20)
-def list_products(request, filter_data: ProductFilterSchema = Query(...)):
+@conditional(table_validators('product', 'category'))
+@paginate(CursorPagination, ordering=('updated_at', 'id'), page_size=20)
+async def list_products(request, filter_data: ProductFilterSchema = Query(...)):
     """
     Get paginated list of products with optional filtering.
-    Supports filtering by active status, price range, and search term.
+    Supports filtering by active status, price range, and search term, and sorting by price.
+    Pass `cursor` (empty for the first page) to page by (updated_at, id), or by price
+    when sorting, instead of page number. Search results are ranked by relevance,
+    which keyset pages cannot follow, so `search` pages by number only.
     """
-    # Base query with active status filter
-    products = (Product.objects.filter(is_active=filter_data.is_active) 
-               if filter_data.is_active is not None 
+    if filter_data.search and request.GET.get('cursor') is not None:
+        raise HttpError(400, 'Search results cannot be paged with a cursor; use page numbers')
+
+    # Active status filter (search results default to active products only)
+    is_active = filter_data.is_active
+    if is_active is None and filter_data.search:
+        is_active = True
+    products = (Product.objects.filter(is_active=is_active)
+               if is_active is not None
                else Product.objects.all())
 
-    # Search filter
+    # Full-text search filter, ranked by relevance
     if filter_data.search:
-        products = Product.objects.filter(
-            is_active=True,
-            name__icontains=filter_data.search
-        ) | Product.objects.filter(
-            is_active=True,
-            description__icontains=filter_data.search
-        )
-
-    # Price range filter
-    if filter_data.min_price or filter_data.max_price:
+        products = search_products(products, filter_data.search)
+
+    # Price range filter, on the indexed base currency amount
+    if filter_data.min_price is not None or filter_data.max_price is not None:
         price_filter = []
-        if filter_data.min_price:
-            price_filter.append(Q(price__gte=filter_data.min_price))
-        if filter_data.max_price:
-            price_filter.append(Q(price__lte=filter_data.max_price))
+        if filter_data.min_price is not None:
+            price_filter.append(Q(price_base_amount__gte=filter_data.min_price))
+        if filter_data.max_price is not None:
+            price_filter.append(Q(price_base_amount__lte=filter_data.max_price))
         products = products.filter(*price_filter)
 
+    # Price sorting (products without a base price cannot be placed and are left out)
+    if filter_data.sort == 'price':
+        products = products.filter(price_base_amount__isnull=False).order_by('price_base_amount', 'id')
+    elif filter_data.sort == '-price':
+        products = products.filter(price_base_amount__isnull=False).order_by('-price_base_amount', '-id')
+
     return products
 
 
+@router.get("/products/export.ndjson",
+            auth=header_key,
+            tags=["Product"])
+def export_products_ndjson(request,
+                           is_active: Optional[bool] = None,
+                           include_images: bool = False,
+                           include_categories: bool = False):
+    """
+    Stream the whole catalog as newline-delimited JSON, one product per line.
+    Optionally embeds images and categories (batched per chunk).
+    """
+    products = (Product.objects.filter(is_active=is_active)
+               if is_active is not None
+               else Product.objects.all())
+
+    # Under ASGI the body is produced with the async ORM, so it is streamed
+    export = aexport_products if isinstance(request, ASGIRequest) else export_products
+    return StreamingHttpResponse(
+        export(products,
+               include_images=include_images,
+               include_categories=include_categories),
+        content_type='application/x-ndjson',
+    )
+
+
 @router.get("/products/{id}/", 
-            auth=header_key, 
+            auth=async_header_key, 
             response={200: ProductInfoSchema}, 
             tags=["Product"])
-def retrieve_product(request, id: str):
+@conditional(product_validators)
+async def retrieve_product(request, id: str):
     """Get detailed information about a specific product."""
-    product = get_object_or_404(Product, id=id)
+    product = await aget_object_or_404(with_related(Product.objects.all(), ProductInfoSchema), id=id)
     return product
 
 
 @router.get("/products/{id}/images/", 
-            auth=header_key, 
+            auth=async_header_key, 
             response={200: List[ProductImageSchema]}, 
             tags=["Product"])
-def retrieve_product_images(request, id: str):
+@conditional(table_validators('product', 'productimage'))
+async def retrieve_product_images(request, id: str):
     """Get all images associated with a specific product."""
-    product = get_object_or_404(Product, id=id)
-    images = ProductImage.objects.filter(product=product)
+    product = await aget_object_or_404(Product, id=id)
+    images = [image async for image in ProductImage.objects.filter(product=product)]
     return images
 
 
 # Category endpoints
 @router.get("/categories/", 
-            auth=header_key, 
+            auth=async_header_key, 
             response={200: List[CategorySchema]}, 
             tags=["Product"])
-@paginate(PageNumberPagination, page_size=20)
-def list_categories(request):
-    """Get paginated list of all product categories."""
+@conditional(table_validators('category'))
+@cache_response('category')
+@paginate(CursorPagination, ordering=('id',), page_size=20)
+async def list_categories(request):
+    """
+    Get paginated list of all product categories.
+    Pass `cursor` (empty for the first page) to page by id instead of page number.
+    """
     categories = Category.objects.all()
     return categories
 
 
 @router.get("/categories/{category_id}/products/", 
-            auth=header_key, 
+            auth=async_header_key, 
             response={200: List[ProductListSchema]}, 
             tags=["Product"])
-@paginate(PageNumberPagination, page_size=20)
-def list_products_by_category(request, category_id: str):
-    """Get paginated list of products in a specific category."""
-    category = get_object_or_404(Category, id=category_id)
+@conditional(table_validators('product', 'category'))
+@cache_response('product', 'category')
+@paginate(CursorPagination, ordering=('updated_at', 'id'), page_size=20)
+async def list_products_by_category(request, category_id: str):
+    """
+    Get paginated list of products in a specific category.
+    Pass `cursor` (empty for the first page) to page by (updated_at, id) instead of page number.
+    """
+    category = await aget_object_or_404(Category, id=category_id)
     products = Product.objects.filter(categories=category)
     return products
 
 
+# Change feed endpoints
+@router.get("/changes/products/",
+            auth=header_key,
+            response={200: ProductChangeFeedSchema, 400: Error, 410: Error},
+            tags=["Changes"])
+def list_product_changes(request, since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1)):
+    """
+    Get products changed and deleted after a watermark, oldest first.
+    Omit `since` for an initial full sync, then pass back the returned `next`.
+    """
+    products = Product.objects.prefetch_related('categories')
+    return change_feed(products, since=since, limit=limit)
+
+
+@router.get("/changes/categories/",
+            auth=header_key,
+            response={200: CategoryChangeFeedSchema, 400: Error, 410: Error},
+            tags=["Changes"])
+def list_category_changes(request, since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1)):
+    """
+    Get categories changed and deleted after a watermark, oldest first.
+    Omit `since` for an initial full sync, then pass back the returned `next`.
+    """
+    return change_feed(Category.objects.all(), since=since, limit=limit)
+
+
 # Exchange rate endpoints
 @router.get("/exchange-rate/",
             auth=header_key,
@@ -164,15 +306,17 @@ def get_exchange_rate_only(request, to_currency: str, from_currency: str = "USD"
     Endpoint to fetch the exchange rate between two currencies.
     Default 'from_currency' is set to 'USD'.
     """
-    rate = Rate.objects.filter(currency=to_currency).first()
-    
-    if rate:
-        return {
-            "rate": float(rate.value),
-            "from_currency": from_currency,
-            "to_currency": to_currency
-        }
-    return 404, {'error': f'Exchange rate for {to_currency} not found.'}
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    try:
+        rate = get_rate_matrix().rate(from_currency, to_currency)
+    except MissingRate:
+        return 404, {'error': f'Exchange rate from {from_currency} to {to_currency} not found.'}
+
+    return {
+        "rate": float(rate),
+        "from_currency": from_currency,
+        "to_currency": to_currency
+    }
 
 
 @router.get(
@@ -190,12 +334,58 @@ def get_converted_product_price(request, product_sku: str, to_currency: str):
 
     # Convert price
     try:
-        converted_price = convert_money(product.price, to_currency)
-    except Exception as e:
+        converted_price = convert_money(product.price, to_currency.upper())
+    except MissingRate as e:
         return 400, {'error': f'Conversion failed: {str(e)}'}
 
     # Return response
     return {
         "product": product.name,
         "price": str(converted_price),
-    }
\ No newline at end of file
+    }
+
+
+@router.post(
+    "/prices/",
+    auth=header_key,
+    response={200: PriceMatrixSchema, 400: Error},
+    tags=["Exchange Rate"]
+)
+def get_price_matrix(request, payload: PriceBatchRequestSchema):
+    """
+    Endpoint to fetch the prices of many products in many currencies at once.
+    Products are selected by SKU list or by category; SKUs that do not exist
+    are listed under `missing`.
+    """
+    if bool(payload.skus) == bool(payload.category_id):
+        return 400, {'error': 'Provide either skus or category_id.'}
+    if len(payload.skus) > settings.PRICE_BATCH_MAX_SKUS:
+        return 400, {'error': f'At most {settings.PRICE_BATCH_MAX_SKUS} SKUs per request.'}
+    if len(payload.currencies) > settings.PRICE_BATCH_MAX_CURRENCIES:
+        return 400, {'error': f'At most {settings.PRICE_BATCH_MAX_CURRENCIES} currencies per request.'}
+
+    currencies = list(dict.fromkeys(currency.upper() for currency in payload.currencies))
+
+    # Fetch every selected product's price in one query
+    if payload.skus:
+        products = Product.objects.filter(sku__in=payload.skus)
+    else:
+        products = Product.objects.filter(categories__id=payload.category_id).order_by('sku')
+    rows = list(products.values_list('sku', 'price', 'price_currency')[:settings.PRICE_BATCH_MAX_SKUS + 1])
+    if len(rows) > settings.PRICE_BATCH_MAX_SKUS:
+        return 400, {'error': f'Category has more than {settings.PRICE_BATCH_MAX_SKUS} products; request SKUs in batches.'}
+
+    try:
+        converted = convert_prices([(price, currency) for _, price, currency in rows], currencies)
+    except MissingRate as e:
+        return 400, {'error': f'Conversion failed: {str(e)}'}
+
+    prices = {
+        sku: [str(amount) for amount in amounts]
+        for (sku, _, _), amounts in zip(rows, converted)
+    }
+    return {
+        "currencies": currencies,
+        "prices": prices,
+        "missing": [sku for sku in dict.fromkeys(payload.skus) if sku not in prices],
+    }
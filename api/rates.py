@@ -0,0 +1,173 @@
+# Standard library imports
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+# Django imports
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Q, Value
+from django.db.models.functions import Round
+
+# Third-party imports
+from moneyed import CurrencyDoesNotExist, get_currency
+from djmoney.contrib.exchange.exceptions import MissingRate
+from djmoney.contrib.exchange.models import ExchangeBackend, get_default_backend_name
+from djmoney.settings import BASE_CURRENCY
+
+# Local imports
+from .versions import bump_versions, get_versions
+
+# Precision of Product.price_base_amount
+BASE_AMOUNT_QUANTUM = Decimal('0.0001')
+
+
+class RateMatrix:
+    """
+    Immutable snapshot of the exchange rates of one backend.
+    Every rate is stored against the backend's base currency, so any-to-any
+    cross rates are a single division and never touch the database.
+    """
+    def __init__(self, base_currency, rates, version=None):
+        self.base_currency = base_currency
+        self.rates = {**rates, base_currency: Decimal(1)}
+        self.version = version
+
+    def rate(self, source, target):
+        """
+        Return how many units of `target` one unit of `source` buys.
+
+        Raises:
+            MissingRate: If either currency has no rate
+        """
+        source, target = str(source), str(target)
+        if source == target:
+            return Decimal(1)
+        try:
+            return self.rates[target] / self.rates[source]
+        except KeyError:
+            raise MissingRate(f"Rate {source} -> {target} does not exist")
+
+    def rate_vector(self, source, targets):
+        """Rates from `source` to each of `targets`, in order."""
+        return [self.rate(source, target) for target in targets]
+
+
+@lru_cache(maxsize=256)
+def currency_quantum(code):
+    """Smallest unit of a currency, e.g. Decimal('0.01') for EUR and Decimal('1') for JPY."""
+    try:
+        sub_unit = get_currency(code).sub_unit
+    except CurrencyDoesNotExist:
+        sub_unit = 100
+    return Decimal(1) / Decimal(sub_unit or 1)
+
+
+def convert_prices(prices, currencies):
+    """
+    Convert many (amount, currency) pairs into each of `currencies`.
+    Rates are resolved once per distinct source currency, and every result is
+    rounded half-up to the minor unit of its target currency.
+
+    Returns:
+        list: One list of Decimal amounts per input price, in `currencies` order
+
+    Raises:
+        MissingRate: If a rate for any source or target currency is missing
+    """
+    matrix = get_rate_matrix()
+    # Targets are checked against the rates before anything is cached for them
+    matrix.rate_vector(matrix.base_currency, currencies)
+    quanta = [currency_quantum(currency) for currency in currencies]
+    vectors = {}
+    converted = []
+    for amount, source in prices:
+        source = str(source)
+        if source not in vectors:
+            vectors[source] = matrix.rate_vector(source, currencies)
+        converted.append([
+            (amount * rate).quantize(quantum, rounding=ROUND_HALF_UP)
+            for rate, quantum in zip(vectors[source], quanta)
+        ])
+    return converted
+
+
+def load_rate_matrix(version=None):
+    """Read the default backend's rates from the database into a new matrix."""
+    backend = ExchangeBackend.objects.filter(name=get_default_backend_name()).first()
+    if backend is None:
+        return RateMatrix(BASE_CURRENCY, {}, version)
+    rates = dict(backend.rates.exclude(value=0).values_list('currency', 'value'))
+    return RateMatrix(backend.base_currency, rates, version)
+
+
+# Matrix of this worker process, replaced whole whenever the 'rate' version changes
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def get_rate_matrix():
+    """
+    Return this process's rate matrix, reloading it once after each rate sync.
+    The version token is read before loading, so a sync committing mid-load
+    only causes one more reload on the next call.
+    """
+    global _matrix
+    version, = get_versions('rate')
+    matrix = _matrix
+    if matrix is None or matrix.version != version:
+        with _matrix_lock:
+            if _matrix is None or _matrix.version != version:
+                _matrix = load_rate_matrix(version)
+            matrix = _matrix
+    return matrix
+
+
+def convert_money(value, currency):
+    """In-memory counterpart of djmoney's convert_money()."""
+    rate = get_rate_matrix().rate(value.currency, currency)
+    return value.__class__(value.amount * rate, currency)
+
+
+def base_price_amount(value):
+    """Express a Money value in PRICE_BASE_CURRENCY, or None when no rate is known."""
+    if value is None:
+        return None
+    try:
+        rate = get_rate_matrix().rate(value.currency, settings.PRICE_BASE_CURRENCY)
+    except MissingRate:
+        return None
+    return (value.amount * rate).quantize(BASE_AMOUNT_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def recalculate_base_prices():
+    """
+    Recompute Product.price_base_amount for the whole catalog with one UPDATE
+    per price currency, e.g. after a rate sync. Products priced in a currency
+    without a rate get NULL, so they drop out of price filters.
+
+    Returns:
+        int: Number of products updated
+    """
+    from .models import Product
+
+    matrix = get_rate_matrix()
+    products = Product.objects.order_by()
+    updated = 0
+    with transaction.atomic():
+        for currency in products.values_list('price_currency', flat=True).distinct():
+            rows = products.filter(price_currency=currency)
+            try:
+                rate = matrix.rate(currency, settings.PRICE_BASE_CURRENCY)
+            except MissingRate:
+                rows, amount = rows.exclude(price_base_amount=None), None
+            else:
+                amount = Round(F('price') * Value(rate, output_field=DecimalField()), 4)
+                # Only rewrite rows whose amount actually changed
+                rows = rows.filter(Q(price_base_amount=None) | ~Q(price_base_amount=amount))
+            updated += rows.update(price_base_amount=amount)
+        if updated:
+            # Price filters and sorting see new values, so cached listings must go
+            bump_versions('product')
+    return updated
+
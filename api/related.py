@@ -0,0 +1,83 @@
+# Standard library imports
+import typing
+from functools import lru_cache, wraps
+
+# Django imports
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+
+# Third-party imports
+from ninja import Schema
+
+
+def _nested_schema(annotation):
+    """Return the Schema class inside an annotation such as Optional[List[X]], if any."""
+    if isinstance(annotation, type):
+        return annotation if issubclass(annotation, Schema) else None
+    for arg in typing.get_args(annotation):
+        schema = _nested_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+@lru_cache(maxsize=None)
+def related_lookups(model, schema, prefix='', prefetch=False):
+    """
+    Work out how to load every relation a schema nests.
+
+    Forward foreign keys and one-to-one fields are joined with
+    select_related(); reverse and many-to-many relations, and anything below
+    them, are batched with prefetch_related(). Fields filled by resolvers are
+    not visible here and must be loaded by the view.
+
+    Returns:
+        tuple: (select_related lookups, prefetch_related lookups)
+    """
+    select, prefetch_lookups = [], []
+    for name, field in schema.model_fields.items():
+        nested = _nested_schema(field.annotation)
+        if nested is None:
+            continue
+        try:
+            model_field = model._meta.get_field(field.alias or name)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        path = f'{prefix}{model_field.name}'
+        many = prefetch or model_field.many_to_many or model_field.one_to_many
+        (prefetch_lookups if many else select).append(path)
+
+        nested_select, nested_prefetch = related_lookups(
+            model_field.related_model, nested, f'{path}__', many)
+        select.extend(nested_select)
+        prefetch_lookups.extend(nested_prefetch)
+    return tuple(select), tuple(prefetch_lookups)
+
+
+def with_related(queryset, schema):
+    """Make a queryset fetch every relation `schema` renders, in a constant number of queries."""
+    select, prefetch = related_lookups(queryset.model, schema)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def load_related(schema):
+    """
+    Decorator applying `with_related` to the queryset a view returns.
+    Place it below @paginate so pagination slices the optimized queryset.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def view_with_related(request, *args, **kwargs):
+            result = view_func(request, *args, **kwargs)
+            if isinstance(result, QuerySet):
+                result = with_related(result, schema)
+            return result
+        return view_with_related
+    return decorator
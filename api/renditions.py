@@ -0,0 +1,119 @@
+# Standard library imports
+import os
+
+# Django imports
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Local imports
+from .imaging import render_variants, supported_formats
+from .jobs import enqueue, task
+from .versions import bump_versions
+
+# Storage directory of rendered variants
+RENDITIONS_DIR = 'product_images/renditions'
+
+
+def rendition_options():
+    """Return (widths, formats, quality) from the settings."""
+    formats = supported_formats(settings.IMAGE_RENDITION_FORMATS)
+    return tuple(settings.IMAGE_RENDITION_WIDTHS), formats, dict(settings.IMAGE_RENDITION_QUALITY)
+
+
+def read_original(image):
+    """Read the uploaded file of a ProductImage."""
+    with image.image.open('rb') as original:
+        return original.read()
+
+
+def store_renditions(image, source, variants):
+    """
+    Save rendered variants under content-hashed names and record them on the
+    image, unless the image was replaced or deleted while rendering. Files of
+    the previous renditions that are no longer used are removed.
+
+    Returns:
+        bool: Whether the renditions were recorded
+    """
+    from .models import ProductImage
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    renditions = []
+    for variant in variants:
+        # Names carry the content digest, so they are served as immutable and a
+        # re-render writes only what changed. They are per image, as deleting
+        # an image deletes its files.
+        name = (f"{RENDITIONS_DIR}/{image.pk}/"
+                f"{stem}-{variant['width']}w.{variant['digest']}.{variant['format']}")
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(variant['content']))
+        renditions.append({
+            'name': name,
+            'format': variant['format'],
+            'type': variant['type'],
+            'width': variant['width'],
+            'height': variant['height'],
+            'size': len(variant['content']),
+        })
+
+    # Record the renditions only if the image still holds the rendered file
+    updated = ProductImage.objects.filter(pk=image.pk, image=source).update(
+        renditions=renditions, renditions_source=source)
+    names = {rendition['name'] for rendition in renditions}
+    if updated:
+        bump_versions('productimage')
+        delete_rendition_files(r for r in image.renditions if r['name'] not in names)
+        image.renditions, image.renditions_source = renditions, source
+    else:
+        delete_rendition_files(renditions)
+    return bool(updated)
+
+
+def delete_rendition_files(renditions):
+    """Remove rendition files from storage."""
+    for rendition in renditions:
+        default_storage.delete(rendition['name'])
+
+
+def generate_renditions(image, executor=None):
+    """
+    Render and store the variants of one ProductImage, in `executor` (a
+    process pool) when given.
+    """
+    source = image.image.name
+    widths, formats, quality = rendition_options()
+    if not formats:
+        return False
+    data = read_original(image)
+    if executor is None:
+        variants = render_variants(data, widths, formats, quality)
+    else:
+        variants = executor.submit(render_variants, data, widths, formats, quality).result()
+    return store_renditions(image, source, variants)
+
+
+@task(queue='renditions', max_attempts=3)
+def render_image_renditions(image_id):
+    """Render the variants of an image, unless they are current already."""
+    from .models import ProductImage
+
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is not None and image.renditions_stale:
+        generate_renditions(image)
+
+
+def schedule_renditions(image_id):
+    """
+    Queue the rendering of an image's variants for the background workers.
+    Images missed anyway (e.g. uploaded before the queue existed) are picked
+    up by the `generate_renditions` command.
+    """
+    enqueue(render_image_renditions, image_id)
+
+
+@task(queue='files')
+def delete_files(names):
+    """Remove files from storage."""
+    for name in names:
+        default_storage.delete(name)
@@ -0,0 +1,154 @@
+# Standard library imports
+import hashlib
+from functools import wraps
+
+# Django imports
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+# Third-party imports
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from ninja.utils import contribute_operation_callback
+
+# Local imports
+from core.compressor.middleware import compress, negotiate_encoding
+from .versions import get_versions
+
+# Cache alias holding rendered responses, shared by every worker on the host
+RESPONSE_CACHE_ALIAS = 'responses'
+
+
+def _auth_scope(request):
+    """Identify who the response was rendered for."""
+    auth = getattr(request, 'auth', None)
+    if auth is None:
+        return 'anon'
+    return f'{auth._meta.label_lower}:{auth.pk}' if hasattr(auth, '_meta') else str(auth)
+
+
+def _cache_key(request, versions):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.get_full_path(), _auth_scope(request), *versions):
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    return f'response:{digest.hexdigest()}'
+
+
+def _encoded_body(entry, encoding):
+    """
+    Return (body, encoding, added) for a cache entry. Bodies too small to be
+    worth compressing are served as is; an encoding seen for the first time is
+    compressed once and `added` tells the caller to write the entry back.
+    """
+    if encoding is None or len(entry['body']) < settings.COMPRESSION_MIN_SIZE:
+        return entry['body'], None, False
+    if encoding in entry['encoded']:
+        return entry['encoded'][encoding], encoding, False
+    entry['encoded'][encoding] = compress(entry['body'], encoding)
+    return entry['encoded'][encoding], encoding, True
+
+
+def _set_body(response, entry, body, encoding):
+    response.uncompressed_size = len(entry['body'])  # Reported by the metrics middleware
+    response.content = body
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+
+def _store_response(request, response):
+    key = getattr(request, '_response_cache_key', None)
+    if key and response.status_code == 200 and not response.streaming \
+            and not response.has_header('Content-Encoding'):
+        entry = {
+            'status': response.status_code,
+            'content_type': response['Content-Type'],
+            'body': response.content,
+            'encoded': {},
+        }
+        encoding = getattr(request, '_response_cache_encoding', None)
+        body, encoding, _ = _encoded_body(entry, encoding)
+        caches[RESPONSE_CACHE_ALIAS].set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        # The compression middleware leaves responses that are already encoded alone
+        _set_body(response, entry, body, encoding)
+    return response
+
+
+def _store_responses(operation):
+    """Wrap the operation so freshly rendered responses are written to the cache."""
+    run = operation.run
+
+    if iscoroutinefunction(run):
+        @wraps(run)
+        async def run_with_cache(request, *args, **kwargs):
+            response = await run(request, *args, **kwargs)
+            return await sync_to_async(_store_response, thread_sensitive=False)(request, response)
+    else:
+        @wraps(run)
+        def run_with_cache(request, *args, **kwargs):
+            return _store_response(request, run(request, *args, **kwargs))
+
+    operation.run = run_with_cache
+
+
+def _cached_response(request, tables, precompress):
+    """Return the cached response for the request, or prepare the miss to be stored."""
+    key = _cache_key(request, get_versions(*tables))
+    encoding = (negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+                if precompress else None)
+
+    cache = caches[RESPONSE_CACHE_ALIAS]
+    entry = cache.get(key)
+    if entry is not None:
+        body, encoding, added = _encoded_body(entry, encoding)
+        if added:
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        response = HttpResponse(status=entry['status'], content_type=entry['content_type'])
+        _set_body(response, entry, body, encoding)
+        return response
+
+    request._response_cache_key = key
+    request._response_cache_encoding = encoding
+    return None
+
+
+def cache_response(*tables, precompress=True):
+    """
+    Decorator caching the final rendered bytes of a ninja GET operation.
+
+    Entries are keyed by path, query string, auth scope and the current
+    version tokens of `tables`. Writes to those tables bump their versions
+    (see api.versions), so stale entries are never served and no TTL has to
+    be guessed. A hit runs after authentication and throttling but skips the
+    view, the ORM and schema serialization. With `precompress`, the
+    compressed body for the client's encoding is stored alongside the
+    original and served as is. Works on sync and async views; for async views
+    the cache reads and writes run in a thread, off the event loop.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            cached_response = sync_to_async(_cached_response, thread_sensitive=False)
+
+            @wraps(view_func)
+            async def view_with_cache(request, **kwargs):
+                response = await cached_response(request, tables, precompress)
+                if response is not None:
+                    return response
+                return await view_func(request, **kwargs)
+        else:
+            @wraps(view_func)
+            def view_with_cache(request, **kwargs):
+                response = _cached_response(request, tables, precompress)
+                if response is not None:
+                    return response
+                return view_func(request, **kwargs)
+
+        # Copy rather than share the callback list inherited through @wraps
+        view_with_cache._ninja_contribute_to_operation = list(
+            getattr(view_func, '_ninja_contribute_to_operation', []))
+        contribute_operation_callback(view_with_cache, _store_responses)
+        return view_with_cache
+
+    return decorator
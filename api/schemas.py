@@ -1,6 +1,9 @@
 # Python standard library imports
 from datetime import datetime, date
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
+
+# Django imports
+from django.core.files.storage import default_storage
 
 # Third-party imports
 from ninja import Schema
@@ -29,22 +32,50 @@ class OrganizationDetailSchema(Schema):
 
 
 # Product-related schemas
+class ImageRenditionSchema(Schema):
+    """Schema for one resized variant of a product image."""
+    url: str
+    type: str
+    width: int
+    height: int
+
+    @staticmethod
+    def resolve_url(obj):
+        return default_storage.url(obj['name'])
+
+
 class ProductImageSchema(Schema):
-    """Schema for product image details."""
+    """
+    Schema for product image details.
+    `renditions` lists the resized variants once they are rendered, and
+    `srcset` holds a ready `srcset` attribute value per MIME type.
+    """
     id: int
     image: str
     alt_text: Optional[str] = None
+    renditions: List[ImageRenditionSchema] = []
+    srcset: Dict[str, str] = {}
+
+    @staticmethod
+    def resolve_srcset(obj):
+        srcset = {}
+        for rendition in obj.renditions:
+            srcset.setdefault(rendition['type'], []).append(
+                f"{default_storage.url(rendition['name'])} {rendition['width']}w")
+        return {mime_type: ', '.join(candidates) for mime_type, candidates in srcset.items()}
 
 
 class ProductFilterSchema(Schema):
     """
     Schema for product filtering parameters.
     Supports filtering by active status, search term, and price range.
+    Prices are compared in PRICE_BASE_CURRENCY, whatever the product currency.
     """
     is_active: Optional[bool] = None
     search: Optional[str] = None
     min_price: Optional[float] = None
     max_price: Optional[float] = None
+    sort: Optional[Literal['price', '-price']] = None
 
 
 class ProductListSchema(Schema):
@@ -66,6 +97,16 @@ class ProductListSchema(Schema):
         return str(obj.price.currency)
 
 
+class ProductExportSchema(ProductListSchema):
+    """
+    Schema for a product row in the NDJSON catalog export.
+    Images and categories are attached separately when requested.
+    """
+    stock_quantity: int
+    created_at: datetime
+    updated_at: datetime
+
+
 class ProductInfoSchema(Schema):
     """
     Schema for detailed product information.
@@ -155,6 +196,83 @@ class PprductSupplierDetails(Schema):
     lead_time: int
 
 
+# Change feed schemas
+class TombstoneSchema(Schema):
+    """Schema for a deleted row reported by a change feed."""
+    object_id: str
+    deleted_at: datetime
+
+
+class ProductChangeSchema(ProductListSchema):
+    """Schema for a changed product in the product change feed."""
+    category_ids: List[str]
+    updated_at: datetime
+
+    @staticmethod
+    def resolve_category_ids(obj):
+        return [category.pk for category in obj.categories.all()]
+
+
+class CategoryChangeSchema(CategorySchema):
+    """Schema for a changed category in the category change feed."""
+    updated_at: datetime
+
+
+class StockChangeSchema(Schema):
+    """Schema for a changed stock row in the stock change feed."""
+    id: str
+    product_id: str
+    warehouse_id: str
+    quantity: int
+    updated_at: datetime
+
+
+class ChangeFeedSchema(Schema):
+    """
+    Base schema for change feed responses.
+    Pass `next` back as `since` to continue; repeat while `has_more` is true.
+    """
+    deleted: List[TombstoneSchema]
+    next: str
+    has_more: bool
+
+
+class ProductChangeFeedSchema(ChangeFeedSchema):
+    changed: List[ProductChangeSchema]
+
+
+class CategoryChangeFeedSchema(ChangeFeedSchema):
+    changed: List[CategoryChangeSchema]
+
+
+class StockChangeFeedSchema(ChangeFeedSchema):
+    changed: List[StockChangeSchema]
+
+
+class StockMovementSchema(Schema):
+    """
+    Schema for a single stock adjustment in a bulk request.
+    Exactly one of `quantity` (absolute level) or `delta` (relative change) is required.
+    """
+    sku: str
+    warehouse_id: str
+    quantity: Optional[int] = None
+    delta: Optional[int] = None
+
+
+class StockMovementResultSchema(Schema):
+    """
+    Schema for the outcome of a single stock adjustment.
+    Status is one of 'created', 'updated' or 'error'.
+    """
+    index: int
+    sku: str
+    warehouse_id: str
+    status: str
+    quantity: Optional[int] = None
+    error: Optional[str] = None
+
+
 class ExchangeRateResponseSchema(Schema):
     """
     Schema for exchange rate response deatils.
@@ -170,4 +288,26 @@ class ProductPriceResponseSchema(Schema):
     """
     product: str
     price: str
-    
\ No newline at end of file
+    
+
+
+class PriceBatchRequestSchema(Schema):
+    """
+    Schema for batch price conversion requests.
+    Select products either by SKU or by category, not both.
+    """
+    skus: List[str] = []
+    category_id: Optional[str] = None
+    currencies: List[str] = Field(..., min_length=1)
+
+
+class PriceMatrixSchema(Schema):
+    """
+    Schema for batch converted prices.
+    `prices` maps each SKU to its amounts in the order of `currencies`,
+    rounded to each currency's minor unit.
+    """
+    currencies: List[str]
+    prices: Dict[str, List[str]]
+    missing: List[str] = []
+
@@ -0,0 +1,201 @@
+# Standard library imports
+import re
+
+# Django imports
+from django.db import connection, transaction
+
+# Name of the FTS5 virtual table mirroring searchable product text
+SEARCH_TABLE = 'product_search'
+
+# Table assigning each product a stable rowid in the FTS5 table
+SEARCH_KEYS_TABLE = 'product_search_keys'
+
+# Column weights used by bm25() ranking: name, sku, description, categories
+SEARCH_WEIGHTS = (10.0, 8.0, 1.0, 4.0)
+
+# Upper bound on terms taken from a single search string
+MAX_SEARCH_TERMS = 8
+
+
+def _tables():
+    """Resolve the database table names the index and triggers depend on."""
+    from .models import Product, Category
+    return {
+        'index': SEARCH_TABLE,
+        'keys': SEARCH_KEYS_TABLE,
+        'products': Product._meta.db_table,
+        'categories': Category._meta.db_table,
+        'links': Product.categories.through._meta.db_table,
+    }
+
+
+def _category_names_sql(product_id_sql):
+    """SQL expression returning the space-separated category names of one product."""
+    return (
+        'SELECT group_concat(c.name, \' \') FROM "{links}" pc '
+        'JOIN "{categories}" c ON c.id = pc.category_id '
+        f'WHERE pc.product_id = {product_id_sql}'
+    )
+
+
+def _docid_sql(product_id_sql):
+    """SQL expression returning the index rowid assigned to one product."""
+    return f'(SELECT docid FROM "{{keys}}" WHERE product_id = {product_id_sql})'
+
+
+def _index_statements():
+    """
+    DDL for the FTS5 table and the triggers keeping it in sync.
+    Triggers (rather than model signals) also cover queryset.update(),
+    bulk_create() and admin imports, which bypass save().
+
+    Products have string primary keys, so their implicit rowid may change
+    (VACUUM, table rebuilds) and is never used. Each index row carries its
+    product id, and the keys table maps product ids to index rowids through
+    a unique index, so triggers find a product's row without a full scan.
+    """
+    indexed_product = '"{index}".product_id'
+    return [
+        'CREATE TABLE IF NOT EXISTS "{keys}" ('
+        'docid INTEGER PRIMARY KEY, product_id TEXT NOT NULL UNIQUE)',
+
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "{index}" USING fts5('
+        'product_id UNINDEXED, name, sku, description, categories, '
+        'tokenize = \'unicode61 remove_diacritics 2\', prefix = \'2 3\')',
+
+        # Products table changes
+        'CREATE TRIGGER IF NOT EXISTS "{index}_insert" AFTER INSERT ON "{products}" BEGIN '
+        'INSERT INTO "{keys}"(product_id) VALUES (new.id); '
+        'INSERT INTO "{index}"(rowid, product_id, name, sku, description, categories) VALUES ('
+        f'{_docid_sql("new.id")}, new.id, new.name, new.sku, coalesce(new.description, \'\'), '
+        f'coalesce(({_category_names_sql("new.id")}), \'\')); END',
+
+        'CREATE TRIGGER IF NOT EXISTS "{index}_update" '
+        'AFTER UPDATE OF name, sku, description ON "{products}" BEGIN '
+        'UPDATE "{index}" SET name = new.name, sku = new.sku, '
+        f'description = coalesce(new.description, \'\') WHERE rowid = {_docid_sql("old.id")}; END',
+
+        'CREATE TRIGGER IF NOT EXISTS "{index}_delete" AFTER DELETE ON "{products}" BEGIN '
+        f'DELETE FROM "{{index}}" WHERE rowid = {_docid_sql("old.id")}; '
+        'DELETE FROM "{keys}" WHERE product_id = old.id; END',
+
+        # Product <=> Category links and category renames
+        'CREATE TRIGGER IF NOT EXISTS "{index}_link" AFTER INSERT ON "{links}" BEGIN '
+        f'UPDATE "{{index}}" SET categories = coalesce(({_category_names_sql("new.product_id")}), \'\') '
+        f'WHERE rowid = {_docid_sql("new.product_id")}; END',
+
+        'CREATE TRIGGER IF NOT EXISTS "{index}_unlink" AFTER DELETE ON "{links}" BEGIN '
+        f'UPDATE "{{index}}" SET categories = coalesce(({_category_names_sql("old.product_id")}), \'\') '
+        f'WHERE rowid = {_docid_sql("old.product_id")}; END',
+
+        'CREATE TRIGGER IF NOT EXISTS "{index}_category_rename" '
+        'AFTER UPDATE OF name ON "{categories}" BEGIN '
+        f'UPDATE "{{index}}" SET categories = coalesce(({_category_names_sql(indexed_product)}), \'\') '
+        'WHERE rowid IN (SELECT k.docid FROM "{keys}" k JOIN "{links}" pc '
+        'ON pc.product_id = k.product_id WHERE pc.category_id = new.id); END',
+    ]
+
+
+def _populate(cursor, tables):
+    """Copy every existing product into the index, one statement per table."""
+    cursor.execute('INSERT INTO "{keys}"(product_id) SELECT id FROM "{products}"'.format(**tables))
+    cursor.execute(
+        'INSERT INTO "{index}"(rowid, product_id, name, sku, description, categories) '
+        'SELECT k.docid, p.id, p.name, p.sku, coalesce(p.description, \'\'), '
+        f'coalesce(({_category_names_sql("p.id")}), \'\') '
+        'FROM "{products}" p JOIN "{keys}" k ON k.product_id = p.id'.format(**tables)
+    )
+    # The product_id column carries no text, so it gets no weight
+    weights = ', '.join(str(weight) for weight in (0.0, *SEARCH_WEIGHTS))
+    cursor.execute(
+        f'INSERT INTO "{SEARCH_TABLE}"("{SEARCH_TABLE}", rank) VALUES (\'rank\', %s)',
+        [f'bm25({weights})'],
+    )
+
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [name])
+    return cursor.fetchone() is not None
+
+
+def search_index_exists():
+    """Check whether the FTS5 table has been created."""
+    with connection.cursor() as cursor:
+        return _table_exists(cursor, SEARCH_TABLE)
+
+
+def _create(cursor, tables):
+    """Drop any previous index, keys and triggers, then build them from the catalog."""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f'{SEARCH_TABLE}_%'],
+    )
+    for (trigger,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+    cursor.execute(f'DROP TABLE IF EXISTS "{SEARCH_TABLE}"')
+    cursor.execute(f'DROP TABLE IF EXISTS "{SEARCH_KEYS_TABLE}"')
+    for statement in _index_statements():
+        cursor.execute(statement.format(**tables))
+    _populate(cursor, tables)
+
+
+def ensure_search_index():
+    """
+    Create the search index and its triggers if missing, filling it from the
+    current catalog the first time. An index of the older layout, joined on
+    the products' rowid, is rebuilt. Safe to call on every migrate.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    tables = _tables()
+    if not {tables['products'], tables['categories'], tables['links']} <= set(
+            connection.introspection.table_names()):
+        return
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not _table_exists(cursor, SEARCH_KEYS_TABLE):
+            _create(cursor, tables)
+        else:
+            for statement in _index_statements():
+                cursor.execute(statement.format(**tables))
+
+
+def rebuild_search_index():
+    """Drop and recreate the search index and triggers from scratch."""
+    tables = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        _create(cursor, tables)
+        cursor.execute(f'INSERT INTO "{SEARCH_TABLE}"("{SEARCH_TABLE}") VALUES (\'optimize\')')
+        cursor.execute(f'SELECT count(*) FROM "{SEARCH_TABLE}"')
+        return cursor.fetchone()[0]
+
+
+def build_match_query(term):
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted prefix
+    term, and all terms must match.
+    """
+    words = re.findall(r'\w+', term or '')[:MAX_SEARCH_TERMS]
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search_products(queryset, term):
+    """
+    Restrict a Product queryset to rows matching `term`, best matches first.
+    """
+    query = build_match_query(term)
+    if not query:
+        return queryset.none()
+
+    products = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[
+            f'"{SEARCH_TABLE}".product_id = "{products}".id',
+            f'"{SEARCH_TABLE}" MATCH %s',
+        ],
+        params=[query],
+        select={'search_rank': f'"{SEARCH_TABLE}".rank'},
+        order_by=['search_rank'],
+    )
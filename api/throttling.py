@@ -0,0 +1,132 @@
+# Standard library imports
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# Django imports
+from django.conf import settings
+
+# Third-party imports
+from ninja.throttling import AnonRateThrottle, AuthRateThrottle
+
+# One statement refills the bucket for the time elapsed since its last use,
+# takes a token if one is available and reports the outcome. SET expressions
+# all see the old row, so `allowed` is decided on the refilled, untaken level.
+TAKE_TOKEN_SQL = '''
+INSERT INTO throttle_buckets (key, tokens, allowed, updated_at) VALUES (:key, :capacity - 1, 1, :now)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:capacity, tokens + (:now - updated_at) * :rate)
+             - (min(:capacity, tokens + (:now - updated_at) * :rate) >= 1),
+    allowed = min(:capacity, tokens + (:now - updated_at) * :rate) >= 1,
+    updated_at = :now
+RETURNING allowed, tokens
+'''
+
+# Buckets idle this long are full again and can be forgotten
+IDLE_BUCKET_SECONDS = 86400
+
+
+class TokenBucketStore:
+    """
+    Token buckets kept in a small SQLite database in WAL mode, so every worker
+    process on the host draws from the same buckets without an external
+    service. Each check is a single UPSERT on the bucket's primary key.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=settings.THROTTLE_BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, allowed INTEGER NOT NULL, '
+                'updated_at REAL NOT NULL) WITHOUT ROWID'
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, capacity, rate):
+        """
+        Take one token from a bucket holding up to `capacity` tokens and
+        refilling at `rate` tokens per second.
+
+        Returns:
+            tuple: (allowed, seconds until the next token when refused)
+        """
+        now = time.time()
+        try:
+            connection = self._connection()
+            allowed, tokens = connection.execute(
+                TAKE_TOKEN_SQL, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+            ).fetchone()
+            if random.random() < settings.THROTTLE_PRUNE_PROBABILITY:
+                connection.execute('DELETE FROM throttle_buckets WHERE updated_at < ?',
+                                   [now - IDLE_BUCKET_SECONDS])
+        except sqlite3.Error:
+            # Never turn a throttling hiccup into an outage
+            return True, None
+        return bool(allowed), None if allowed else (1 - tokens) / rate
+
+
+token_buckets = TokenBucketStore(settings.THROTTLE_DB_PATH)
+
+
+class TokenBucketThrottleMixin:
+    """
+    Replaces ninja's per-process request history with a shared token bucket.
+    A rate of N/period allows bursts of N requests and refills N tokens per
+    period. Throttle instances are shared by threads, so the wait time of the
+    last refusal is kept per thread.
+    """
+    store = token_buckets
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last = threading.local()
+
+    def get_request_rate(self, request):
+        """Return (requests, seconds) allowed for this request."""
+        return self.num_requests, self.duration
+
+    def allow_request(self, request):
+        key = self.get_cache_key(request)
+        if key is None:
+            return True
+
+        num_requests, duration = self.get_request_rate(request)
+        allowed, wait = self.store.take(key, num_requests, num_requests / duration)
+        self._last.wait = wait
+        return allowed
+
+    def wait(self):
+        return getattr(self._last, 'wait', None)
+
+
+class SharedAnonRateThrottle(TokenBucketThrottleMixin, AnonRateThrottle):
+    """Per-client-IP limit for unauthenticated requests, shared across workers."""
+
+
+class SharedAuthRateThrottle(TokenBucketThrottleMixin, AuthRateThrottle):
+    """
+    Per-credential limit for authenticated requests, shared across workers.
+    API keys with a `rate_limit` use it instead of the default rate.
+    """
+    def get_cache_key(self, request):
+        auth = getattr(request, 'auth', None)
+        if hasattr(auth, '_meta'):
+            return f'throttle_{self.scope}_{auth._meta.label_lower}_{auth.pk}'
+        return super().get_cache_key(request)
+
+    def get_request_rate(self, request):
+        rate_limit = getattr(getattr(request, 'auth', None), 'rate_limit', None)
+        if rate_limit:
+            return self.parse_rate(rate_limit)
+        return super().get_request_rate(request)
@@ -0,0 +1,58 @@
+# Standard library imports
+import time
+
+# Django imports
+from django.core.cache import caches
+from django.db import transaction
+
+# Third-party imports
+from asgiref.sync import sync_to_async
+
+# Cache alias shared by every worker on the host
+VERSION_CACHE_ALIAS = 'shared'
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def _new_token():
+    """Version tokens are nanosecond timestamps, so they also date the change."""
+    return time.time_ns()
+
+
+def bump_versions(*names):
+    """
+    Give each named table a new version once the current transaction commits.
+    Bumping on commit ensures no reader can pair the new version with old data.
+    """
+    def bump():
+        token = _new_token()
+        caches[VERSION_CACHE_ALIAS].set_many({_key(name): token for name in names}, timeout=None)
+    transaction.on_commit(bump)
+
+
+def get_versions(*names):
+    """
+    Return the current version token of each named table, in order.
+    A missing token (first use, or evicted from the cache) is replaced by a
+    fresh one, which invalidates anything derived from the old token.
+    """
+    cache = caches[VERSION_CACHE_ALIAS]
+    keys = [_key(name) for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_token(), timeout=None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+async def aget_versions(*names):
+    """get_versions() for async views, run in a thread so cache file I/O does not block the event loop."""
+    return await sync_to_async(get_versions, thread_sensitive=False)(*names)
+
+
+def versions_timestamp(versions):
+    """Convert version tokens to the Unix time of the most recent change."""
+    return max(versions) // 1_000_000_000 if versions else None
@@ -0,0 +1,9 @@
+import os
+from decouple import config
+from django.core.asgi import get_asgi_application
+
+# Set the Django settings file from MODE, like manage.py does.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", f"core.settings.{config('MODE')}")
+
+# Create the ASGI application.
+application = get_asgi_application()
@@ -1,28 +1,178 @@
+import zlib
+
 import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+# zstd is offered only when the optional `zstandard` package is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson')
+
+# Supported encodings in server preference order (used to break q-value ties)
+ENCODINGS = ('br', 'zstd', 'gzip') if zstandard else ('br', 'gzip')
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into {coding: q-value}.
+    Codings without a q parameter get 1.0; malformed q-values count as 0.
+    """
+    preferences = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[coding] = quality
+    return preferences
+
+
+def negotiate_encoding(header):
+    """
+    Pick the best supported encoding for an Accept-Encoding header,
+    or None when the client accepts none of them.
+    """
+    preferences = parse_accept_encoding(header or '')
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = preferences.get(encoding, preferences.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    """Compress a complete body with a level tuned for dynamic content."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _stream_compressor(encoding):
+    """Return (process, flush, finish) callables of an incremental compressor."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+        return (compressor.compress,
+                lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                compressor.flush)
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compress a streaming body incrementally.
+    Each chunk is flushed as soon as it is compressed, so the client keeps
+    receiving data and the full body is never buffered in memory.
+    """
+    process, flush, finish = _stream_compressor(encoding)
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding):
+    """`compress_stream` for the async iterators of streaming responses under ASGI."""
+    process, flush, finish = _stream_compressor(encoding)
+    async for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses text and JSON responses with the best encoding the client
+    accepts (br, zstd or gzip, by q-value). Bodies below COMPRESSION_MIN_SIZE
+    are sent as is, and streaming responses are compressed chunk by chunk.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
 
-class BrotliMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Check if client accepts brotli compression
-        if 'br' not in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress_response(request, await self.get_response(request))
+
+    def compress_response(self, request, response):
+        # Don't compress if response is already compressed or is a partial body
+        if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
             return response
-            
-        # Don't compress if response is already compressed
-        if response.has_header('Content-Encoding'):
+
+        # Files served with byte ranges are sent as stored, so ranges stay
+        # valid and the file can go out with sendfile()
+        if response.get('Accept-Ranges') == 'bytes':
             return response
-            
+
         # Only compress text responses
-        if not response.get('Content-Type', '').startswith(('text/', 'application/json')):
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        # The body depends on Accept-Encoding from here on
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        # Skip small bodies, where compression costs more than it saves
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
             return response
-            
-        # Compress content
-        compressed_content = brotli.compress(response.content)
-        response.content = compressed_content
-        response['Content-Length'] = str(len(compressed_content))
-        response['Content-Encoding'] = 'br'
-        
-        return response
\ No newline at end of file
+
+        if response.streaming:
+            # Compress streaming content chunk by chunk
+            stream = acompress_stream if response.is_async else compress_stream
+            response.streaming_content = stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            compressed_content = compress(response.content, encoding)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.uncompressed_size = len(response.content)  # Reported by the metrics middleware
+            response.content = compressed_content
+            response['Content-Length'] = str(len(compressed_content))
+
+        # The compressed body is no longer byte-identical, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        response['Content-Encoding'] = encoding
+        return response
+
+
+# Backwards compatible name
+BrotliMiddleware = CompressionMiddleware
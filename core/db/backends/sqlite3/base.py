@@ -0,0 +1,165 @@
+"""
+SQLite backend with optional host-wide write serialization.
+
+SQLite allows a single writer per database. When several gunicorn workers
+write at once, all but one spin on busy_timeout and, under load, some give up
+with "database is locked". With the `write_lock` option every write
+transaction first takes an exclusive lock on a file next to the database
+(threads of one process queue on a threading.Lock, processes on flock), so
+writers wait in line instead of polling SQLite. Reads never take the lock
+and keep running concurrently under WAL.
+"""
+
+# Standard library imports
+import os
+import threading
+import time
+
+# Django imports
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads of one process are still serialized
+    fcntl = None
+
+# Statements that never write, run without the lock in autocommit mode
+READ_PREFIXES = ('SELECT', 'PRAGMA', 'EXPLAIN', 'WITH')
+
+
+class HostWriteLock:
+    """
+    Exclusive lock shared by every thread and process of one host.
+    A process holds one file descriptor and flocks it on behalf of whichever
+    of its threads holds the thread lock.
+    """
+    def __init__(self, path, timeout=20.0):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        # A descriptor inherited through fork() shares its flock with the
+        # parent, so every process opens its own
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def acquire(self):
+        """Wait up to `timeout` seconds for the lock, then fail like SQLite would."""
+        deadline = time.monotonic() + self.timeout
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise OperationalError('database is locked')
+        if fcntl is None:
+            return
+
+        delay = 0.0005
+        try:
+            fd = self._file()
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise OperationalError('database is locked')
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.01)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+# One lock per lock file, shared by every connection of the process
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def host_write_lock(path, timeout):
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = HostWriteLock(path, timeout)
+        return lock
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's sqlite3 backend plus the `write_lock` OPTIONS flag.
+    `write_lock_path` (default: NAME + '-writelock') and `write_lock_timeout`
+    (seconds, default 20) tune it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_lock = None
+        self._holds_write_lock = False
+        # Registered first, so it runs outermost and query timings exclude lock waits
+        self.execute_wrappers.append(self._serialize_autocommit_write)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        enabled = kwargs.pop('write_lock', False)
+        path = kwargs.pop('write_lock_path', None)
+        timeout = kwargs.pop('write_lock_timeout', 20.0)
+        if enabled and not self.is_in_memory_db():
+            path = str(path or f"{self.settings_dict['NAME']}-writelock")
+            self.write_lock = host_write_lock(path, float(timeout))
+        return kwargs
+
+    def _acquire_write_lock(self):
+        self.write_lock.acquire()
+        self._holds_write_lock = True
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            self.write_lock.release()
+
+    def _start_transaction_under_autocommit(self):
+        # Every atomic block may write, so it waits for its turn before BEGIN
+        if self.write_lock is None:
+            return super()._start_transaction_under_autocommit()
+        self._acquire_write_lock()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _serialize_autocommit_write(self, execute, sql, params, many, context):
+        """Run single write statements outside atomic blocks under the lock too."""
+        if (self.write_lock is None or self._holds_write_lock or self.in_atomic_block
+                or sql.lstrip()[:7].upper().startswith(READ_PREFIXES)):
+            return execute(sql, params, many, context)
+        self._acquire_write_lock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._release_write_lock()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,115 @@
+import os
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Metrics are written to per-process files so every gunicorn worker and the
+# scheduler process add up correctly. The directory has to be known before
+# prometheus_client is imported.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', str(settings.METRICS_DIR))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess  # noqa: E402
+from prometheus_client import CONTENT_TYPE_LATEST  # noqa: E402
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+REQUEST_LATENCY = Histogram(
+    'pimify_http_request_duration_seconds',
+    'Time spent handling a request, by route',
+    ['route', 'method', 'status'],
+)
+RESPONSE_SIZE = Histogram(
+    'pimify_http_response_size_bytes',
+    'Response body size before (uncompressed) and after (sent) compression',
+    ['route', 'stage'],
+    buckets=SIZE_BUCKETS,
+)
+THROTTLED_REQUESTS = Counter(
+    'pimify_http_throttled_requests',
+    'Requests rejected by API throttling',
+    ['route'],
+)
+DB_QUERIES = Histogram(
+    'pimify_db_queries_per_request',
+    'SQL queries run by a sampled request',
+    ['route'],
+    buckets=QUERY_BUCKETS,
+)
+DB_QUERY_TIME = Counter(
+    'pimify_db_query_seconds',
+    'Cumulative SQL time of sampled requests',
+    ['route'],
+)
+SCHEDULER_JOB_DURATION = Histogram(
+    'pimify_scheduler_job_duration_seconds',
+    'Run time of scheduler jobs',
+    ['job'],
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+SCHEDULER_JOB_FAILURES = Counter(
+    'pimify_scheduler_job_failures',
+    'Scheduler job runs that raised an exception',
+    ['job'],
+)
+QUEUE_JOB_DURATION = Histogram(
+    'pimify_queue_job_duration_seconds',
+    'Run time of background queue jobs',
+    ['queue', 'task'],
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600),
+)
+QUEUE_JOB_FAILURES = Counter(
+    'pimify_queue_job_failures',
+    'Background queue job runs that raised an exception',
+    ['queue', 'task'],
+)
+
+
+@contextmanager
+def track_job(name):
+    """Time a scheduler job and count it as failed if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SCHEDULER_JOB_FAILURES.labels(name).inc()
+        raise
+    finally:
+        SCHEDULER_JOB_DURATION.labels(name).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_queue_job(queue, task):
+    """Time a background queue job and count it as failed if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        QUEUE_JOB_FAILURES.labels(queue, task).inc()
+        raise
+    finally:
+        QUEUE_JOB_DURATION.labels(queue, task).observe(time.perf_counter() - start)
+
+
+def metrics_view(request):
+    """
+    Expose the metrics of every process in the Prometheus text format.
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`; without
+    a token configured the endpoint is closed. Behind a proxy on the same host
+    every client appears as 127.0.0.1, so the address check alone is not enough.
+    """
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if not token or scheme.lower() != 'bearer' or not secrets.compare_digest(credentials.strip(), token):
+        return HttpResponseForbidden()
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,206 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import DB_QUERIES, DB_QUERY_TIME, REQUEST_LATENCY, RESPONSE_SIZE, THROTTLED_REQUESTS
+
+
+class QueryStats:
+    """Query count and cumulative SQL time collected by a connection execute wrapper."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# QueryStats of the sampled request being handled. Context variables follow
+# the request into the threads that run the ORM for async views, where
+# connection objects are not the ones the middleware sees.
+_request_query_stats = ContextVar('request_query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection, counting for sampled requests."""
+    stats = _request_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    # Inserted near the front, because execute_wrapper() blocks pop the last
+    # entry, but inside the backend's write serializer, so timings exclude
+    # waits for the host write lock
+    if record_query not in connection.execute_wrappers:
+        serializer = getattr(connection, '_serialize_autocommit_write', None)
+        wrappers = connection.execute_wrappers
+        position = wrappers.index(serializer) + 1 if serializer in wrappers else 0
+        wrappers.insert(position, record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class RouteStats:
+    """
+    Per-route aggregates of sampled requests, kept by each worker process.
+    Each entry holds [requests, queries, sql seconds, total seconds, max queries].
+    """
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, queries, sql_time, total_time):
+        with self._lock:
+            entry = self._routes.setdefault(route, [0, 0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += queries
+            entry[2] += sql_time
+            entry[3] += total_time
+            entry[4] = max(entry[4], queries)
+
+    def snapshot(self):
+        """Return {route: {...}} with totals and per-request averages."""
+        with self._lock:
+            routes = {route: list(entry) for route, entry in self._routes.items()}
+        return {
+            route: {
+                'requests': requests,
+                'queries': queries,
+                'sql_seconds': sql_time,
+                'total_seconds': total_time,
+                'max_queries': max_queries,
+                'avg_queries': queries / requests,
+                'avg_sql_ms': sql_time * 1000 / requests,
+            }
+            for route, (requests, queries, sql_time, total_time, max_queries) in routes.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def route_name(request):
+    """URL pattern that handled the request, so all product ids share one entry."""
+    match = getattr(request, 'resolver_match', None)
+    return f'/{match.route}' if match is not None else 'unmatched'
+
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware running natively under both WSGI and ASGI, so an
+    async stack never hops to a thread for it. Subclasses implement
+    `__call__` and `__acall__`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class QueryTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Counts SQL queries and their cumulative time for a sample of requests.
+    Sampled responses carry a Server-Timing header (which the gunicorn access
+    log records) and feed the per-route aggregates in `route_stats`.
+    Queries run while a streaming response is being sent are not counted.
+    """
+    @staticmethod
+    def sampled():
+        sample_rate = settings.QUERY_TIMING_SAMPLE_RATE
+        return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        stats = QueryStats()
+        token = _request_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_query_stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        stats = QueryStats()
+        token = _request_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_query_stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - start)
+
+    def record(self, request, response, stats, total):
+        route = route_name(request)
+        route_stats.record(route, stats.count, stats.duration, total)
+        DB_QUERIES.labels(route).observe(stats.count)
+        DB_QUERY_TIME.labels(route).inc(stats.duration)
+        response['Server-Timing'] = (
+            f'db;desc="{stats.count} queries";dur={stats.duration * 1000:.1f}, '
+            f'app;dur={total * 1000:.1f}'
+        )
+        return response
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Records latency, response sizes and throttle rejections of every request
+    as Prometheus metrics. Sits first, so latency covers the whole stack and
+    the sent size is measured after compression.
+    """
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    def record(self, request, response, elapsed):
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(elapsed)
+        if response.status_code == 429:
+            THROTTLED_REQUESTS.labels(route).inc()
+        if not response.streaming:
+            sent = len(response.content)
+            RESPONSE_SIZE.labels(route, 'uncompressed').observe(getattr(response, 'uncompressed_size', sent))
+            RESPONSE_SIZE.labels(route, 'sent').observe(sent)
+        return response
@@ -0,0 +1,75 @@
+# Standard library imports
+import gzip
+import hashlib
+import os
+import re
+
+# Third-party imports
+import brotli
+
+# Django imports
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+# A 16 hex digit content hash right before the extension, e.g. photo.1f0c9a3b5d7e2468.jpg,
+# optionally followed by the random suffix storage adds when the name is taken
+HASHED_NAME = re.compile(r'\.(?P<hash>[0-9a-f]{16})(?:_[A-Za-z0-9]{7})?\.[A-Za-z0-9]+$')
+
+# Media types worth storing precompressed next to the original
+PRECOMPRESSED_TYPES = ('.svg', '.json', '.txt', '.csv', '.xml')
+
+# Precompressed variants by encoding, in server preference order. Files are
+# compressed once, so the slowest, smallest settings are used.
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+PRECOMPRESSORS = {
+    'br': lambda data: brotli.compress(data, quality=11),
+    'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+}
+
+
+def content_hash(content):
+    digest = hashlib.blake2b(digest_size=8)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    File system storage that puts a hash of the content into every new file
+    name, so a media URL always refers to the same bytes and can be cached
+    forever. Text-like files (SVG, JSON, ...) also get .br and .gz variants
+    to serve to clients that accept them.
+    """
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = ContentFile(content.read() if hasattr(content, 'read') else content)
+        if not HASHED_NAME.search(name):
+            root, ext = os.path.splitext(name)
+            suffix = f'.{content_hash(content)}{ext}'
+            # Shorten the file name rather than let storage cut the hash off
+            if max_length is not None and len(root) + len(suffix) > max_length:
+                root = root[:max_length - len(suffix)]
+            name = root + suffix
+        name = super().save(name, content, max_length=max_length)
+        if name.lower().endswith(PRECOMPRESSED_TYPES):
+            self._save_precompressed(name)
+        return name
+
+    def _save_precompressed(self, name):
+        with self.open(name, 'rb') as original:
+            data = original.read()
+        if len(data) < settings.COMPRESSION_MIN_SIZE:
+            return
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            compressed = PRECOMPRESSORS[encoding](data)
+            if len(compressed) < len(data):
+                self._save(name + suffix, ContentFile(compressed))
+
+    def delete(self, name):
+        super().delete(name)
+        for suffix in PRECOMPRESSED_SUFFIXES.values():
+            if self.exists(name + suffix):
+                super().delete(name + suffix)
@@ -0,0 +1,194 @@
+# Standard library imports
+import mimetypes
+import os
+import posixpath
+import re
+
+# Third-party imports
+from asgiref.sync import sync_to_async
+
+# Django imports
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Local imports
+from core.compressor.middleware import parse_accept_encoding
+from .storage import HASHED_NAME, PRECOMPRESSED_SUFFIXES
+
+# A single byte range: "bytes=0-499", "bytes=500-" or the suffix form "bytes=-500"
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Chunk size of file reads under ASGI, where the server cannot use sendfile()
+ASYNC_BLOCK_SIZE = 64 * 1024
+
+
+class FileRange:
+    """
+    Read-only window of `length` bytes of an open file from its current
+    position. It exposes the file descriptor, so gunicorn still hands the
+    window to sendfile() with Content-Length as the byte count.
+    """
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header against a file of `size` bytes.
+
+    Returns:
+        tuple: (start, end) of the inclusive byte range, None when the header
+        is absent, malformed or asks for several ranges (the whole file is
+        sent then), or False when the range cannot be satisfied
+    """
+    match = RANGE_HEADER.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        return (max(0, size - length), size - 1) if length and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, end
+
+
+def choose_variant(request, path):
+    """
+    Pick the best precompressed variant of `path` the client accepts.
+
+    Returns:
+        tuple: (path to serve, its Content-Encoding or None, whether any
+        precompressed variant exists)
+    """
+    variants = {encoding: path + suffix for encoding, suffix in PRECOMPRESSED_SUFFIXES.items()
+                if os.path.exists(path + suffix)}
+    if variants:
+        preferences = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, variant in variants.items():
+            if preferences.get(encoding, preferences.get('*', 0.0)) > 0:
+                return variant, encoding, True
+    return path, None, bool(variants)
+
+
+def if_range_matches(request, etag, last_modified):
+    """Whether the validator of an If-Range header still matches the file."""
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag
+    if value.startswith('W/'):
+        return False
+    modified_since = parse_http_date_safe(value)
+    return modified_since is not None and int(last_modified) <= modified_since
+
+
+async def _aread(file, length):
+    """Stream `length` bytes of a file without blocking the event loop."""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while length > 0:
+            data = await read(min(ASYNC_BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT.
+
+    Files with a content hash in their name never change, so they are cached
+    for a year as immutable; others are revalidated after MEDIA_MAX_AGE.
+    Supports conditional requests, single byte ranges and the precompressed
+    .br/.gz variants stored by HashedMediaStorage. The body is a FileResponse
+    over the open file, which gunicorn sends with sendfile().
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, posixpath.normpath(path).lstrip('/'))
+    except SuspiciousFileOperation:
+        raise Http404("File does not exist")
+    if not os.path.isfile(fullpath):
+        raise Http404("File does not exist")
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    filepath, encoding, varies = choose_variant(request, fullpath)
+    stat = os.stat(filepath)
+    size = stat.st_size
+
+    hashed = HASHED_NAME.search(path)
+    tag = hashed['hash'] if hashed else f'{size:x}-{int(stat.st_mtime):x}'
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': ('public, max-age=31536000, immutable' if hashed
+                          else f'public, max-age={settings.MEDIA_MAX_AGE}'),
+        'Accept-Ranges': 'bytes',
+    }
+    if varies:
+        headers['Vary'] = 'Accept-Encoding'
+
+    # 304 and 412 responses carry the validators and caching headers too
+    unconditional = HttpResponse(headers=headers)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime),
+                                        response=unconditional)
+    if response is not unconditional:
+        return response
+
+    byte_range = None
+    if if_range_matches(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    file = open(filepath, 'rb')
+    file.seek(start)
+    if isinstance(request, ASGIRequest):
+        # Django would buffer a synchronous file iterator under ASGI
+        response = FileResponse(content_type=content_type, headers=headers)
+        response.streaming_content = _aread(file, length)
+    else:
+        response = FileResponse(FileRange(file, length), content_type=content_type, headers=headers)
+    response['Content-Length'] = str(length)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
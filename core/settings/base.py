@@ -4,6 +4,7 @@ from pathlib import Path
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.templatetags.static import static
+from core.sqlite import PROFILES as SQLITE_PROFILES, init_command as sqlite_init_command
 
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,11 +55,66 @@ DJANGO_MONEY_RATES = {
     'OPEN_EXCHANGE_RATES_URL': "https://openexchangerates.org/api/latest.json",
 }
 
+# Per-worker API key verification cache
+API_KEY_CACHE = {
+    'MAX_SIZE': 1024,  # Verified keys kept per worker
+    'TTL': 60,  # Seconds before a verified key is re-checked (bounds revocation delay)
+    'NEGATIVE_MAX_SIZE': 4096,  # Unknown or inactive keys kept per worker
+    'NEGATIVE_TTL': 10,  # Seconds an unknown or inactive key is remembered
+}
+
+# Rows fetched, serialized and flushed per chunk by the NDJSON product export
+PRODUCT_EXPORT_CHUNK_SIZE = 1000
+
+# Change feed settings
+CHANGE_FEED_MAX_LIMIT = 1000  # Rows per page of changes and of deletions
+CHANGE_FEED_SETTLE_SECONDS = 2  # Hold back very recent rows so late commits are not skipped
+CHANGE_FEED_TOMBSTONE_MAX_AGE = 30  # Days deletions are kept; older watermarks must resync
+
+# Maximum number of rows accepted by the bulk stock movement endpoint
+STOCK_BULK_MAX_ITEMS = 5000
+
+# Currency of Product.price_base_amount, used by price filters and sorting
+PRICE_BASE_CURRENCY = 'USD'
+
+# Batch price conversion limits
+PRICE_BATCH_MAX_SKUS = 1000  # Products priced per request
+PRICE_BATCH_MAX_CURRENCIES = 50  # Target currencies per request
+
+# Admin dashboard metrics
+DASHBOARD_METRICS_REFRESH_SECONDS = 60  # How often dirty sections are recomputed (by the scheduler, or on view)
+DASHBOARD_LOW_STOCK_THRESHOLD = 10  # Products with less stock count as low stock
+
+# Response compression settings
+COMPRESSION_MIN_SIZE = 860  # Bytes; smaller bodies are sent uncompressed
+COMPRESSION_BROTLI_QUALITY = 4  # 0-11; low qualities suit per-request dynamic content
+COMPRESSION_GZIP_LEVEL = 6  # 1-9
+COMPRESSION_ZSTD_LEVEL = 3  # Used only when the optional zstandard package is installed
+
+# Seconds a rendered response is kept. Entries are invalidated by table
+# version bumps; the timeout only bounds how long orphaned entries linger.
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Fraction of requests whose SQL queries are counted and timed (0 disables, 1 times every request)
+QUERY_TIMING_SAMPLE_RATE = 1.0
+
+# Shared API throttling (token buckets in a SQLite file used by every worker on the host)
+THROTTLE_DB_PATH = BASE_DIR / '../data/throttle.sqlite3'
+THROTTLE_BUSY_TIMEOUT = 1  # Seconds to wait for the bucket file lock before letting the request through
+THROTTLE_PRUNE_PROBABILITY = 0.001  # Chance per request of deleting idle buckets
+
+# Prometheus metrics
+METRICS_DIR = BASE_DIR / '../data/metrics'  # Per-process metric files, shared by workers and the scheduler
+METRICS_TOKEN = config("METRICS_TOKEN", default="")  # Bearer token scrapers send to /metrics; empty disables the endpoint
+METRICS_ALLOWED_IPS = None  # Optional list of client addresses also required to scrape /metrics
+
 # Middleware configuration
 MIDDLEWARE = [
-    "core.compressor.middleware.BrotliMiddleware",
+    "core.instrumentation.middleware.RequestMetricsMiddleware",
+    "core.instrumentation.middleware.QueryTimingMiddleware",
+    "core.compressor.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # For serving static files
+    "core.staticfiles.middleware.WhiteNoiseMiddleware",  # For serving static files
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -89,20 +145,54 @@ TEMPLATES = [
 
 # WSGI and ASGI configuration
 WSGI_APPLICATION = "core.wsgi.application"
+ASGI_APPLICATION = "core.asgi.application"
 
 # Database configuration using SQLite
+# SQLite pragma profile applied to every new connection (see core/sqlite.py)
+SQLITE_PROFILE = config("SQLITE_PROFILE", default="balanced")  # durable, balanced or fast
+SQLITE_PRAGMAS = {
+    **SQLITE_PROFILES[SQLITE_PROFILE],
+    # Override single pragmas of the profile here, e.g. 'mmap_size': 0
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',  # Django's sqlite3 backend plus optional write serialization
         'NAME': BASE_DIR / "../data/db.sqlite3",
+        'CONN_MAX_AGE': config("CONN_MAX_AGE", default=600, cast=int),  # Seconds to reuse a connection
+        'CONN_HEALTH_CHECKS': True,  # Check reused connections before each request
         "OPTIONS": {
-            "init_command": "PRAGMA journal_mode=WAL;",  # Write-Ahead Logging
-            "init_command": "PRAGMA synchronous = NORMAL;",  # Optimize performance
-            "timeout": 20,
+            "init_command": sqlite_init_command(SQLITE_PRAGMAS),
+            "transaction_mode": "IMMEDIATE",  # Take the write lock at BEGIN, so busy_timeout always applies
+            "write_lock": config("SQLITE_WRITE_LOCK", default=False, cast=bool),  # Queue writers on a host-wide file lock
         },
     }
 }
 
+# Group commit: batch request writes into shared transactions (see core/db/writer.py)
+SQLITE_WRITE_QUEUE = config("SQLITE_WRITE_QUEUE", default=False, cast=bool)
+SQLITE_WRITE_QUEUE_MAX_BATCH = 50  # Jobs per transaction
+SQLITE_WRITE_QUEUE_MAX_DELAY = 0.002  # Seconds to wait for more jobs before committing
+
+# Cache configuration. The 'shared' cache lives on disk so every gunicorn
+# worker on the host sees the same entries (used for table version tokens).
+# Rendered responses get their own cache so culling them never drops versions.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '../data/cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '../data/response_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
 # Password validation settings
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -132,6 +222,43 @@ STATICFILES_DIRS = [BASE_DIR / '../static_src']
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / '../media'
 
+# Uploads are stored under content-hashed names and served by core.media.views
+STORAGES = {
+    "default": {
+        "BACKEND": "core.media.storage.HashedMediaStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+SERVE_MEDIA = config("SERVE_MEDIA", default=True, cast=bool)  # Turn off when a separate file server handles MEDIA_URL
+MEDIA_MAX_AGE = 3600  # Seconds browsers cache media without a content hash in the name
+
+# Product image renditions, rendered in the background after upload (see api/renditions.py)
+IMAGE_RENDITION_WIDTHS = (320, 640, 1024, 1600)  # Never wider than the original
+IMAGE_RENDITION_FORMATS = ('avif', 'webp')  # AVIF needs Pillow 11.3+ or the pillow-avif-plugin package
+IMAGE_RENDITION_QUALITY = {'avif': 50, 'webp': 75}
+
+# Bulk imports from the admin (see api/imports.py)
+IMPORT_ROOT = BASE_DIR / '../data/imports'  # Uploaded import files, never served
+IMPORT_CHUNK_SIZE = 2000  # Rows read, looked up and written per bulk statement
+IMPORT_MAX_ERRORS = 100  # Row errors kept on an import job
+
+# Background job queue (see api/jobs.py), run by `python manage.py worker`
+JOB_WORKER_PROCESSES = config("JOB_WORKER_PROCESSES", default=2, cast=int)  # Worker processes started by the command
+JOB_QUEUE_CONCURRENCY = {  # Running jobs per queue across all workers; unlisted queues are unlimited
+    'imports': 1,
+    'renditions': config("IMAGE_RENDITION_WORKERS", default=2, cast=int),
+}
+JOB_MAX_ATTEMPTS = 5  # Runs before a failing job is given up
+JOB_RETRY_BACKOFF = 10  # Seconds before the first retry, doubled after every failed attempt
+JOB_RETRY_BACKOFF_MAX = 3600  # Upper bound of the retry delay
+JOB_POLL_INTERVAL = 1.0  # Seconds an idle worker waits before looking for jobs again
+JOB_HEARTBEAT_INTERVAL = 30  # Seconds between heartbeats of a running job
+JOB_LEASE_TIMEOUT = 300  # Running jobs without a heartbeat for this long are put back, on any host
+JOB_SHUTDOWN_TIMEOUT = 60  # Seconds workers get to finish their current job on shutdown
+JOB_RETENTION_DAYS = 7  # Finished jobs are deleted after this many days; failed ones are kept
+
 # STATICFILES_STORAGE = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
 
 # Backup settings
@@ -319,6 +446,8 @@ UNFOLD = {
             "models": [
                 "api.organization",
                 "api.apikey",
+                "api.job",
+                "api.importjob",
                 "django_apscheduler.djangojobexecution",
                 "django_apscheduler.djangojob",
             ],
@@ -333,6 +462,16 @@ UNFOLD = {
                     "link": reverse_lazy("admin:api_apikey_changelist"),
                     "permission": lambda request: request.user.is_superuser,
                 },
+                {
+                    "title": _("Background Jobs"),
+                    "link": reverse_lazy("admin:api_job_changelist"),
+                    "permission": lambda request: request.user.is_superuser,
+                },
+                {
+                    "title": _("Import Jobs"),
+                    "link": reverse_lazy("admin:api_importjob_changelist"),
+                    "permission": lambda request: request.user.is_superuser,
+                },
                 {
                     "title": _("Scheduled Jobs"),
                     "link": reverse_lazy("admin:django_apscheduler_djangojob_changelist"),
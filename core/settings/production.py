@@ -57,7 +57,7 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
 
 # Add WhiteNoise middleware after SecurityMiddleware
-MIDDLEWARE.insert(2, "whitenoise.middleware.WhiteNoiseMiddleware") # For serving static files
+MIDDLEWARE.insert(4, "core.staticfiles.middleware.WhiteNoiseMiddleware") # For serving static files
 
 # Static files storage configuration
 STORAGES = {
@@ -65,7 +65,7 @@ STORAGES = {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "BACKEND": "core.media.storage.HashedMediaStorage",
         "LOCATION": MEDIA_ROOT,  # Ensure MEDIA_ROOT is defined above
     },
 }
@@ -0,0 +1,49 @@
+"""
+SQLite pragma profiles.
+
+Pragmas are per connection (journal_mode is also stored in the database
+file), so the chosen profile is turned into the `init_command` that Django
+runs on every new connection. With CONN_MAX_AGE, connections and their page
+cache are reused across requests.
+"""
+
+PROFILES = {
+    # Every commit is fsynced; survives power loss without losing transactions
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 20000,
+        'cache_size': -16000,
+        'temp_store': 'DEFAULT',
+        'mmap_size': 0,
+    },
+    # WAL with fsync at checkpoints only: a power loss may drop the last
+    # commits but never corrupts the database. Recommended default.
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+        'cache_size': -64000,  # Negative values are KiB, so 64 MB per connection
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,  # 256 MB of the file read through the page cache of the OS
+    },
+    # No fsync at all. For throwaway databases (tests, benchmarks) only.
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'busy_timeout': 20000,
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456,
+    },
+}
+
+
+def pragma_statements(pragmas):
+    """Turn {pragma: value} into a list of PRAGMA statements."""
+    return [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+
+def init_command(pragmas):
+    """Build the sqlite3 backend's `init_command` from {pragma: value}."""
+    return ';'.join(pragma_statements(pragmas))
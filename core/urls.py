@@ -1,12 +1,16 @@
 # Import necessary modules
+import re
+
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
 
 from api.management.commands import scheduler
 from api.main import app
+from core.instrumentation.metrics import metrics_view
+from core.media.views import serve_media
 
 urlpatterns = [
     # Redirect root URL to dashboard
@@ -17,6 +21,9 @@ urlpatterns = [
     
     # API endpoints (version 1)
     path('api/v1/', app.urls),
+
+    # Prometheus metrics
+    path('metrics', metrics_view),
 ]
 
 # # Only start the scheduler if the OPEN_EXCHANGE_RATES_APP_ID is set
@@ -25,10 +32,13 @@ urlpatterns = [
 # else:
 #     print("OPEN_EXCHANGE_RATES_APP_ID is not set. Scheduler will not start.")
 
-# Serve static and media files in development
+# Serve static files in development
 if settings.DEBUG:
     # Serve static files (CSS, JavaScript, etc.)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    
-    # Serve media files (user-uploaded content)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+
+# Serve media files (user-uploaded content), with caching and Range support
+if settings.SERVE_MEDIA or settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
+    ]
\ No newline at end of file
@@ -1,9 +1,9 @@
 import os
+from decouple import config
 from django.core.wsgi import get_wsgi_application  
 
-# Set the Django settings file.
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# Set the Django settings file from MODE, like manage.py does.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", f"core.settings.{config('MODE')}")
 
 # Create the WSGI application.
 application = get_wsgi_application()
-
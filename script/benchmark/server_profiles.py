@@ -0,0 +1,171 @@
+"""
+Throughput and tail latency of the wsgi (gthread) and asgi (uvicorn)
+gunicorn profiles of script/gunicorn/gunicorn.conf.py.
+
+Starts gunicorn once per profile on a local port and drives it with
+keep-alive clients, while a number of slow clients trickle their request
+headers in and read the response late, the way mobile clients on bad
+networks do:
+
+    python script/benchmark/server_profiles.py [--clients 64] [--slow 32] \
+        [--path /api/v1/public/products/ --api-key KEY]
+
+Run it from the repository root with the .env of the instance to test.
+For each profile it reports requests per second and the p50/p99/max
+latency seen by the fast clients.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+PROFILES = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile, port, workers):
+    env = {**os.environ, 'SERVER_PROFILE': profile}
+    process = subprocess.Popen(
+        ['gunicorn', '-c', 'script/gunicorn/gunicorn.conf.py',
+         '-b', f'127.0.0.1:{port}', '-w', str(workers), '--access-logfile', '/dev/null'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'gunicorn ({profile}) did not start')
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def request_bytes(path, api_key):
+    lines = [f'GET {path} HTTP/1.1', 'Host: localhost', 'Accept-Encoding: br']
+    if api_key:
+        lines.append(f'X-API-Key: {api_key}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response with a Content-Length or chunked body."""
+    status = await reader.readline()
+    if not status:
+        raise ConnectionError('connection closed')
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return int(status.split()[1])
+
+
+async def fast_client(port, request, stop, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+        errors.append(type(exc).__name__)
+    finally:
+        writer.close()
+
+
+async def slow_client(port, request, stop, delay):
+    """Send the request a few bytes at a time, then wait before reading."""
+    while time.monotonic() < stop:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for start in range(0, len(request), 8):
+                writer.write(request[start:start + 8])
+                await writer.drain()
+                await asyncio.sleep(delay)
+            await asyncio.sleep(delay * 10)
+            await read_response(reader)
+            writer.close()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await asyncio.sleep(delay)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def drive(port, request, clients, slow, seconds, slow_delay):
+    stop = time.monotonic() + seconds
+    latencies, errors = [], []
+    tasks = [fast_client(port, request, stop, latencies, errors) for _ in range(clients)]
+    tasks += [slow_client(port, request, stop, slow_delay) for _ in range(slow)]
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/v1/public/health', help='endpoint to request')
+    parser.add_argument('--api-key', help='X-API-Key header for authenticated endpoints')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers per profile')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent keep-alive clients')
+    parser.add_argument('--slow', type=int, default=32, help='concurrent slow clients')
+    parser.add_argument('--slow-delay', type=float, default=0.05, help='seconds between slow client writes')
+    parser.add_argument('--seconds', type=float, default=10.0, help='duration per profile')
+    parser.add_argument('--profiles', nargs='*', default=list(PROFILES), choices=PROFILES)
+    args = parser.parse_args()
+
+    request = request_bytes(args.path, args.api_key)
+    print(f"{'profile':<8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for profile in args.profiles:
+        port = free_port()
+        process = start_server(profile, port, args.workers)
+        try:
+            latencies, errors = asyncio.run(
+                drive(port, request, args.clients, args.slow, args.seconds, args.slow_delay))
+        finally:
+            stop_server(process)
+        print(f"{profile:<8} {len(latencies) / args.seconds:>9,.0f} "
+              f"{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+              f"{max(latencies, default=float('nan')) * 1000:>8.1f} {len(errors):>7}")
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
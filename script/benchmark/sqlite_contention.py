@@ -0,0 +1,163 @@
+"""
+Write contention on SQLite with and without write serialization.
+
+Several processes (think gunicorn workers), each with several threads, run
+read-then-write transactions against a scratch database for a few seconds,
+while one extra thread per process keeps reading:
+
+    python script/benchmark/sqlite_contention.py [--processes 4] [--threads 4] [--profile durable]
+
+Modes:
+    deferred     Django's default BEGIN; upgrading a read lock to a write
+                 lock fails at once with "database is locked"
+    immediate    BEGIN IMMEDIATE; writers poll busy_timeout
+    write_lock   core.db.backends.sqlite3 with the host-wide write lock
+    write_queue  write_lock plus the group-commit queue of core/db/writer.py
+
+For each mode it reports committed transactions per second, the share of
+transactions that failed with "database is locked", and reads per second.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from core.sqlite import PROFILES  # noqa: E402
+
+MODES = ('deferred', 'immediate', 'write_lock', 'write_queue')
+ROWS = 1000
+
+
+def setup_django(path, mode, profile, busy_timeout):
+    import django
+    from django.conf import settings
+
+    from core.sqlite import init_command
+
+    options = {'init_command': init_command({**PROFILES[profile], 'busy_timeout': busy_timeout})}
+    if mode != 'deferred':
+        options['transaction_mode'] = 'IMMEDIATE'
+    if mode in ('write_lock', 'write_queue'):
+        options.update(write_lock=True, write_lock_timeout=busy_timeout / 1000)
+    settings.configure(
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3' if mode in ('deferred', 'immediate')
+            else 'core.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': options,
+        }},
+        SQLITE_WRITE_QUEUE=mode == 'write_queue',
+        SQLITE_WRITE_QUEUE_MAX_BATCH=50,
+        SQLITE_WRITE_QUEUE_MAX_DELAY=0,
+    )
+    django.setup()
+
+
+def move_stock(row_id, delta):
+    """A typical read-then-write: look the row up, then store the new quantity."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT quantity FROM stock WHERE id = %s', [row_id])
+        quantity = cursor.fetchone()[0]
+        cursor.execute('UPDATE stock SET quantity = %s WHERE id = %s', [quantity + delta, row_id])
+
+
+def worker(path, mode, profile, threads, seconds, busy_timeout, results):
+    setup_django(path, mode, profile, busy_timeout)
+    from django.db import OperationalError, connection, transaction
+
+    from core.db.writer import run_write
+
+    counts = {'commits': 0, 'locked': 0, 'reads': 0}
+    guard = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def writer():
+        while time.perf_counter() < stop:
+            try:
+                if mode == 'write_queue':
+                    run_write(move_stock, random.randint(1, ROWS), 1)
+                else:
+                    with transaction.atomic():
+                        move_stock(random.randint(1, ROWS), 1)
+                key = 'commits'
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                key = 'locked'
+            with guard:
+                counts[key] += 1
+        connection.close()
+
+    def reader():
+        while time.perf_counter() < stop:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT quantity FROM stock WHERE id = %s', [random.randint(1, ROWS)])
+                cursor.fetchone()
+            with guard:
+                counts['reads'] += 1
+        connection.close()
+
+    pool = [threading.Thread(target=writer) for _ in range(threads)]
+    pool.append(threading.Thread(target=reader))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def run(mode, profile, processes, threads, seconds, busy_timeout):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE stock (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL)')
+        connection.executemany('INSERT INTO stock (quantity) VALUES (?)', [(0,)] * ROWS)
+        connection.commit()
+        connection.close()
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        pool = [context.Process(target=worker, args=(path, mode, profile, threads, seconds, busy_timeout, results))
+                for _ in range(processes)]
+        for process in pool:
+            process.start()
+        totals = {'commits': 0, 'locked': 0, 'reads': 0}
+        for _ in pool:
+            for key, value in results.get().items():
+                totals[key] += value
+        for process in pool:
+            process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='writer threads per process')
+    parser.add_argument('--seconds', type=float, default=3.0, help='duration of each mode')
+    parser.add_argument('--busy-timeout', type=int, default=5000, help='busy_timeout in milliseconds')
+    parser.add_argument('--profile', default='balanced', choices=list(PROFILES), help='pragma profile')
+    parser.add_argument('--modes', nargs='*', default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'commits/s':>10} {'locked':>8} {'locked %':>9} {'reads/s':>10}")
+    for mode in args.modes:
+        totals = run(mode, args.profile, args.processes, args.threads, args.seconds, args.busy_timeout)
+        attempts = totals['commits'] + totals['locked']
+        locked = 100 * totals['locked'] / attempts if attempts else 0
+        print(f"{mode:<12} {totals['commits'] / args.seconds:>10,.0f} {totals['locked']:>8} "
+              f"{locked:>8.1f}% {totals['reads'] / args.seconds:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
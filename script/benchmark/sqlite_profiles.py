@@ -0,0 +1,132 @@
+"""
+Read/write throughput of the SQLite pragma profiles in core/sqlite.py.
+
+Runs against a scratch database in a temporary directory (never the real
+one), with a products-like table:
+
+    python script/benchmark/sqlite_profiles.py [--rows 20000] [--threads 4]
+
+For each profile it reports single-row commits per second, point reads per
+second on a persistent connection and with a new connection per read
+(CONN_MAX_AGE=0), and reads per second from several threads while one
+thread keeps writing.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from core.sqlite import PROFILES, pragma_statements  # noqa: E402
+
+SCHEMA = '''
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    sku TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    description TEXT,
+    price REAL NOT NULL,
+    stock_quantity INTEGER NOT NULL
+)
+'''
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    for statement in pragma_statements(pragmas):
+        connection.execute(statement)
+    return connection
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float('inf')
+
+
+def bench_writes(path, pragmas, rows):
+    connection = connect(path, pragmas)
+    start = time.perf_counter()
+    for i in range(rows):
+        connection.execute(
+            'INSERT INTO products (sku, name, description, price, stock_quantity) VALUES (?, ?, ?, ?, ?)',
+            (f'SKU-{i}', f'Product {i}', 'x' * 200, i * 1.5, i % 100),
+        )
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return rate(rows, elapsed)
+
+
+def bench_reads(path, pragmas, rows, reads, reconnect=False):
+    ids = [random.randint(1, rows) for _ in range(reads)]
+    connection = None if reconnect else connect(path, pragmas)
+    start = time.perf_counter()
+    for product_id in ids:
+        if reconnect:
+            connection = connect(path, pragmas)
+        connection.execute('SELECT * FROM products WHERE id = ?', (product_id,)).fetchone()
+        if reconnect:
+            connection.close()
+    elapsed = time.perf_counter() - start
+    if not reconnect:
+        connection.close()
+    return rate(reads, elapsed)
+
+
+def bench_mixed(path, pragmas, rows, threads, seconds=2.0):
+    """Reads per second from `threads` readers while one writer updates rows."""
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def reader(index):
+        connection = connect(path, pragmas)
+        while time.perf_counter() < stop:
+            connection.execute('SELECT * FROM products WHERE id = ?', (random.randint(1, rows),)).fetchone()
+            counts[index] += 1
+        connection.close()
+
+    def writer():
+        connection = connect(path, pragmas)
+        while time.perf_counter() < stop:
+            connection.execute('UPDATE products SET stock_quantity = stock_quantity + 1 WHERE id = ?',
+                               (random.randint(1, rows),))
+        connection.close()
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=writer))
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return rate(sum(counts), seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='rows inserted (one commit each)')
+    parser.add_argument('--reads', type=int, default=20000, help='point reads per read test')
+    parser.add_argument('--threads', type=int, default=4, help='reader threads in the mixed test')
+    parser.add_argument('--profiles', nargs='*', default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'commits/s':>12} {'reads/s':>12} {'reads/s new conn':>18} {'mixed reads/s':>15}")
+    for name in args.profiles:
+        pragmas = PROFILES[name]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            connection = connect(path, pragmas)
+            connection.execute(SCHEMA)
+            connection.close()
+
+            writes = bench_writes(path, pragmas, args.rows)
+            reads = bench_reads(path, pragmas, args.rows, args.reads)
+            reconnect_reads = bench_reads(path, pragmas, args.rows, args.reads // 10, reconnect=True)
+            mixed = bench_mixed(path, pragmas, args.rows, args.threads)
+        print(f"{name:<10} {writes:>12,.0f} {reads:>12,.0f} {reconnect_reads:>18,.0f} {mixed:>15,.0f}")
+
+
+if __name__ == '__main__':
+    main()
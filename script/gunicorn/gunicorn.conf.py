@@ -1,13 +1,33 @@
 import multiprocessing
+import os
+import re
+
+# Not imported by name: "config" is itself a gunicorn setting
+import decouple
 
 # Server socket configuration
 bind = '0.0.0.0:8000'
 backlog = 2048  # Number of pending connections queue will hold
 
+# Deployment profile (SERVER_PROFILE in .env):
+# - wsgi = core.wsgi with threaded workers; each request holds a thread until
+#          the last byte reaches the client
+# - asgi = core.asgi with uvicorn event loop workers; async API views wait for
+#          slow clients and the database without holding a thread
+server_profile = decouple.config("SERVER_PROFILE", default="wsgi")
+
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "gthread"
-threads = 4
+if server_profile == "asgi":
+    wsgi_app = "core.asgi:application"
+    workers = multiprocessing.cpu_count() + 1
+    worker_class = "uvicorn_worker.UvicornWorker"
+    # Django opens one connection per async request, so they cannot be reused
+    os.environ.setdefault("CONN_MAX_AGE", "0")
+else:
+    wsgi_app = "core.wsgi:application"
+    workers = multiprocessing.cpu_count() * 2 + 1
+    worker_class = "gthread"
+    threads = 4
 worker_connections = 1000
 max_requests = 10000
 max_requests_jitter = 1000  # Prevents all workers from restarting at once
@@ -26,10 +46,41 @@ limit_request_field_size = 8190
 accesslog = '-'  # Log access to stdout
 errorlog = '-'   # Log errors to stdout
 loglevel = 'info'
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(L)s'
+# Ends with the Server-Timing header of sampled requests: db;desc="<n> queries";dur=<ms>, app;dur=<ms>
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(L)s timing="%({server-timing}o)s"'
 
 # Recommended: Run Gunicorn behind a reverse proxy like NGINX
 # proxy_protocol = True
 
 # Process naming
-proc_name = "gunicorn_app"
\ No newline at end of file
+proc_name = "gunicorn_app"
+
+# Prometheus multiprocess metrics: every worker writes its own files here,
+# and /metrics adds them up (matches METRICS_DIR in the Django settings)
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.abspath('data/metrics'))
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def on_starting(server):
+    """Drop metric files left by processes from earlier runs."""
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        match = re.search(r'_(\d+)\.db$', name)
+        if match and not _process_alive(int(match.group(1))):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    """Let the multiprocess collector forget live gauges of a dead worker."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
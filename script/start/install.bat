@@ -39,7 +39,11 @@ python manage.py collectstatic
 
 # Start the scheduler
 echo "Starting scheduler..."
-python manage.py scheduler
+start /B python manage.py scheduler
+
+:: Start the background job worker
+echo Starting background job worker...
+start /B python manage.py worker
 
 # Create Superuser
 echo "Creating superuser..."
@@ -24,7 +24,11 @@ python manage.py collectstatic --noinput
 
 # Start the scheduler
 echo "Starting scheduler..."
-python manage.py scheduler
+python manage.py scheduler &
+
+# Start the background job worker
+echo "Starting background job worker..."
+python manage.py worker &
 
 # Cleanup
 echo "Cleaning up..."
@@ -32,4 +36,4 @@ rm -rf /root/.cache/pip /var/cache/apk/*
 
 # Start the development server
 echo "Starting the server..."
-gunicorn core.wsgi:application -c script/gunicorn/gunicorn.conf.py
\ No newline at end of file
+gunicorn -c script/gunicorn/gunicorn.conf.py
\ No newline at end of file
@@ -39,7 +39,11 @@ python manage.py collectstatic
 
 # Start the scheduler
 echo "Starting scheduler..."
-python manage.py scheduler
+python manage.py scheduler &
+
+# Start the background job worker
+echo "Starting background job worker..."
+python manage.py worker &
 
 # Create Superuser
 echo "Creating superuser..."
@@ -47,4 +51,4 @@ python manage.py createsuperuser
 
 # Start the development server
 echo "Starting the server..."
-gunicorn core.wsgi:application -c script/gunicorn/gunicorn.conf.py
+gunicorn -c script/gunicorn/gunicorn.conf.py